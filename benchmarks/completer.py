@@ -0,0 +1,52 @@
+"""Time completing `cd v1/...` keystroke by keystroke in a tree of 10k
+endpoints, with and without the cached child listings of tree nodes.
+
+Usage, with http-prompt installed (make install):
+
+    python benchmarks/completer.py
+"""
+
+import time
+
+from unittest.mock import patch
+
+from prompt_toolkit.document import Document
+
+from http_prompt.completer import HttpPromptCompleter
+from http_prompt.context import Context
+from http_prompt.tree import Node
+
+
+def time_keystrokes(num_paths=10000):
+    paths = {'/v1/items%d' % i: {} for i in range(num_paths)}
+    context = Context('http://localhost', spec={'paths': paths})
+    completer = HttpPromptCompleter(context)
+
+    command = 'cd v1/items%d' % (num_paths - 1)
+    times = []
+    for i in range(len('cd v1/'), len(command) + 1):
+        start = time.perf_counter()
+        list(completer.get_completions(
+            Document(text=command[:i], cursor_position=i), None))
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def uncached_listing(node, listing=Node.listing):
+    node._listing = None
+    return listing(node)
+
+
+def report(name, times):
+    print('%s: first keystroke %.4fs, later keystrokes %.4fs on average' %
+          (name, times[0], sum(times[1:]) / len(times[1:])))
+
+
+def main():
+    report('cached listings', time_keystrokes())
+    with patch.object(Node, 'listing', uncached_listing):
+        report('uncached listings', time_keystrokes())
+
+
+if __name__ == '__main__':
+    main()
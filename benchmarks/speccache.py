@@ -0,0 +1,88 @@
+"""Compare parse_spec() with the previous way of loading specs: decoding
+them as text, trying JSON and then falling back to the pure Python YAML
+loader.
+
+Usage, with http-prompt installed (make install):
+
+    python benchmarks/speccache.py [SPEC_FILE ...]
+
+Without arguments, generated specs of the size of large real-world APIs
+are used, in both JSON and YAML.
+"""
+
+import json
+import sys
+import time
+
+import yaml
+
+from http_prompt.speccache import parse_spec, YAMLLoader
+
+
+def make_spec(num_paths):
+    """Make a spec shaped like real-world ones, with `num_paths` paths."""
+    parameter = {'name': 'page', 'in': 'query', 'required': False,
+                 'type': 'integer', 'description': 'Page number'}
+    response = {'description': 'OK', 'schema': {
+        'type': 'object',
+        'properties': {'id': {'type': 'integer'}, 'name': {'type': 'string'}}
+    }}
+    paths = {}
+    for i in range(num_paths):
+        operation = {
+            'summary': 'Operation %d' % i,
+            'parameters': [
+                parameter, dict(parameter, name='id', **{'in': 'path'})
+            ],
+            'responses': {'200': response, '404': {'description': 'Gone'}}
+        }
+        paths['/resources%d/{id}/items' % i] = {
+            'get': operation, 'put': operation, 'delete': operation
+        }
+    spec = {'swagger': '2.0', 'host': 'example.com', 'paths': paths}
+    # Unshare the objects, so YAML doesn't dump them as aliases
+    return json.loads(json.dumps(spec))
+
+
+def legacy_parse(content, url=None):
+    content = content.decode()
+    try:
+        return json.loads(content)
+    except json.JSONDecodeError:
+        return yaml.safe_load(content)
+
+
+def best_time(func, content, url, repeat=3):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(content, url=url)
+        times.append(time.perf_counter() - start)
+    return result, min(times)
+
+
+def compare(name, content, url=None):
+    new_result, new_time = best_time(parse_spec, content, url)
+    old_result, old_time = best_time(legacy_parse, content, url)
+    assert new_result == old_result
+    print('%s, %d bytes: %.3fs (was %.3fs)' %
+          (name, len(content), new_time, old_time))
+
+
+def main(args):
+    print('YAML loader: %s' % YAMLLoader.__name__)
+    if args:
+        for path in args:
+            with open(path, 'rb') as f:
+                compare(path, f.read(), url='file:' + path)
+        return
+
+    for num_paths in (500, 2000):
+        spec = make_spec(num_paths)
+        compare('JSON spec, %d paths' % num_paths, json.dumps(spec).encode())
+        compare('YAML spec, %d paths' % num_paths,
+                yaml.safe_dump(spec).encode())
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,155 @@
+"""Load testing of a single request, for the bench command."""
+
+import inspect
+import io
+import threading
+
+from collections import Counter
+from time import perf_counter
+
+import requests
+
+from httpie.cli.definition import parser
+from httpie.client import collect_messages
+from httpie.context import Environment
+
+from .engine import RequestEngine
+
+
+# HTTPie 3.0 passes the environment to collect_messages(), where earlier
+# versions passed the config directory after the arguments
+_COLLECT_MESSAGES_TAKES_ENV = (
+    'env' in inspect.signature(collect_messages).parameters)
+
+
+def _collect_messages(env, args):
+    if _COLLECT_MESSAGES_TAKES_ENV:
+        return collect_messages(env, args)
+    return collect_messages(args, env.config.directory)
+
+
+def percentile(sorted_values, percent):
+    """Return the value below which `percent` percent of `sorted_values`
+    fall, using the nearest-rank method.
+    """
+    if not sorted_values:
+        return None
+    rank = -(-len(sorted_values) * percent // 100)  # Ceiling division
+    return sorted_values[max(int(rank), 1) - 1]
+
+
+class BenchResult(object):
+    """Latencies and outcomes of the requests made by a benchmark."""
+
+    def __init__(self):
+        self.latencies = []
+        # Status code or exception class name => count
+        self.outcomes = Counter()
+        self.elapsed = 0
+        self.interrupted = False
+
+    def add(self, latency, outcome):
+        self.latencies.append(latency)
+        self.outcomes[outcome] += 1
+
+    def format(self):
+        """Format the result as a report of several lines of text."""
+        count = len(self.latencies)
+        lines = ['Requests:    %d%s' % (
+            count, ' (interrupted)' if self.interrupted else '')]
+        if self.elapsed:
+            lines.append('Time:        %.3fs' % self.elapsed)
+            lines.append('Throughput:  %.1f requests/s' %
+                         (count / self.elapsed))
+        if count:
+            latencies = sorted(self.latencies)
+            lines.append('Latency:     min %.1fms, mean %.1fms, max %.1fms' %
+                         (latencies[0] * 1000,
+                          sum(latencies) / count * 1000,
+                          latencies[-1] * 1000))
+            lines.append('Percentiles: %s' % ', '.join(
+                'p%d %.1fms' % (p, percentile(latencies, p) * 1000)
+                for p in (50, 90, 95, 99)))
+        lines.append('Outcomes:')
+        for outcome, num in sorted(self.outcomes.items(),
+                                   key=lambda item: str(item[0])):
+            lines.append('  %-10s %d' % (outcome, num))
+        return '\n'.join(lines) + '\n'
+
+
+class Benchmark(object):
+    """Make the request described by HTTPie arguments `args` `num_requests`
+    times, with `concurrency` requests in flight at once over kept-alive
+    connections.
+    """
+
+    def __init__(self, args, num_requests=100, concurrency=1):
+        self.num_requests = num_requests
+        self.concurrency = max(1, min(concurrency, num_requests))
+
+        self._env = Environment(stdout=io.BytesIO(), stdin=None,
+                                is_windows=False)
+        self._env.stdin_isatty = True
+        self._args = parser.parse_args(
+            args=['--ignore-stdin'] + list(args), env=self._env)
+
+        self._engine = RequestEngine(max_connections=self.concurrency)
+        self._lock = threading.Lock()
+        self._started = 0
+        self._stopped = False
+        self._result = BenchResult()
+
+    def _next(self):
+        with self._lock:
+            if self._stopped or self._started >= self.num_requests:
+                return False
+            self._started += 1
+            return True
+
+    def _request(self):
+        response = None
+        with self._engine.bind():
+            for message in _collect_messages(self._env, self._args):
+                if isinstance(message, requests.Response):
+                    response = message
+                    # Read the whole body, as a client would
+                    response.content
+                    response.close()
+        return response.status_code if response is not None else None
+
+    def _work(self):
+        while self._next():
+            start = perf_counter()
+            try:
+                outcome = self._request()
+            except Exception as err:
+                outcome = type(err).__name__
+            latency = perf_counter() - start
+            with self._lock:
+                self._result.add(latency, outcome)
+
+    def run(self):
+        """Run the benchmark and return a BenchResult. Pressing Ctrl-C stops
+        the benchmark early.
+        """
+        threads = [threading.Thread(target=self._work)
+                   for _ in range(self.concurrency)]
+        start = perf_counter()
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+        try:
+            for thread in threads:
+                # Join with a timeout so Ctrl-C is noticed
+                while thread.is_alive():
+                    thread.join(0.1)
+        except KeyboardInterrupt:
+            with self._lock:
+                self._stopped = True
+            self._result.interrupted = True
+            for thread in threads:
+                thread.join()
+        finally:
+            self._result.elapsed = perf_counter() - start
+            self._engine.close()
+        return self._result
@@ -125,7 +125,11 @@ class CompletionGenerator(object):
                                       context.options, OPTION_NAMES)
 
     def urlpaths(self, context, match):
-        path = urlparse(context.url).path.split('/')
+        url = context.url
+        if context.servers:
+            # The tree follows the paths on the default server
+            url = context.servers.to_default(url)
+        path = urlparse(url).path.split('/')
         overrided_path = match.group(2)
         if overrided_path:
             if overrided_path.startswith('/'):
@@ -6,6 +6,7 @@ from . import options as opt
 
 
 ROOT_COMMANDS = OrderedDict([
+    ('bench', 'Benchmark a request, e.g. bench get -n 1000 -c 20 /path'),
     ('cd', 'Change URL/path'),
     ('clear', 'Clear console screen'),
     ('curl', 'Preview curl command'),
@@ -24,6 +25,11 @@ ROOT_COMMANDS = OrderedDict([
     ('rm -q', 'Remove querystring parameter'),
     ('rm -q *', 'Remove all querystring parameters'),
     ('source', 'Load environment from a file'),
+    ('source -j', 'Load environment from a file, running up to N '
+                  'requests at once'),
+    ('timing', 'Print the timings of the last requests'),
+    ('timing off', 'Stop timing requests'),
+    ('timing on', 'Time requests and print the timing of each'),
 ])
 
 ACTIONS = OrderedDict([
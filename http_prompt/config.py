@@ -1,10 +1,32 @@
-"""Functions that deal with the user configuration."""
+"""Functions that deal with the user configuration.
 
+The user config is either a Python module, config.py, or a declarative
+config.toml or config.json file with the same settings as top-level keys.
+The compiled code of config.py is cached in the user data directory until
+the file changes.
+"""
+
+import importlib.util
+import json
+import marshal
 import os
 import shutil
 
+try:
+    import tomllib
+except ImportError:  # Python < 3.11
+    try:
+        import tomli as tomllib
+    except ImportError:
+        tomllib = None
+
 from . import defaultconfig
 from . import xdg
+from .utils import write_atomic
+
+
+# User config files in order of precedence
+USER_CONFIG_NAMES = ('config.toml', 'config.json', 'config.py')
 
 
 def get_user_config_path():
@@ -12,6 +34,24 @@ def get_user_config_path():
     return os.path.join(xdg.get_config_dir(), 'config.py')
 
 
+def find_user_config():
+    """Find the user config file in use.
+
+    Returns:
+        tuple: A tuple of (path, stamp). `stamp` changes whenever the file
+            does. Both are None if there's no user config file.
+    """
+    config_dir = xdg.get_config_dir()
+    for name in USER_CONFIG_NAMES:
+        path = os.path.join(config_dir, name)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        return path, (path, stat.st_mtime_ns, stat.st_size)
+    return None, None
+
+
 def initialize():
     """Initialize a default config file if it doesn't exist yet.
 
@@ -20,9 +60,10 @@ def initialize():
             this function created the default config file. `dst_path` is the
             path of the user config file.
     """
-    dst_path = get_user_config_path()
+    dst_path, _ = find_user_config()
     copied = False
-    if not os.path.exists(dst_path):
+    if dst_path is None:
+        dst_path = get_user_config_path()
         src_path = os.path.join(os.path.dirname(__file__), 'defaultconfig.py')
         shutil.copyfile(src_path, dst_path)
         copied = True
@@ -43,15 +84,64 @@ def load_default():
     return _module_to_dict(defaultconfig)
 
 
-def load_user():
-    """Read user config file and return it as a dict."""
-    config_path = get_user_config_path()
+def _compile_cached(path, stamp):
+    """Compile a Python file, reusing the code cached for it in the data
+    directory if the file hasn't changed since.
+    """
+    cache_path = os.path.join(xdg.get_data_dir(), 'config.cache')
+    key = (importlib.util.MAGIC_NUMBER, stamp)
+    try:
+        with open(cache_path, 'rb') as f:
+            cached_key, code = marshal.load(f)
+        if cached_key == key:
+            return code
+    except (OSError, EOFError, ValueError, TypeError):
+        pass
+
+    with open(path) as f:
+        code = compile(f.read(), path, 'exec')
+    try:
+        write_atomic(cache_path, marshal.dumps((key, code)))
+    except OSError:
+        pass
+    return code
+
+
+def _load_python(path, stamp):
     config = {}
+    exec(_compile_cached(path, stamp), config)
+    return config
+
+
+def _load_toml(path):
+    if tomllib is None:
+        raise RuntimeError('Reading %s requires Python 3.11 or the tomli '
+                           'package' % path)
+    with open(path, 'rb') as f:
+        return tomllib.load(f)
+
 
-    # TODO: This may be overkill and too slow just for reading a config file
-    with open(config_path) as f:
-        code = compile(f.read(), config_path, 'exec')
-    exec(code, config)
+def _load_json(path):
+    with open(path, encoding='utf-8') as f:
+        config = json.load(f)
+    if not isinstance(config, dict):
+        raise ValueError('%s must contain a JSON object' % path)
+    return config
+
+
+def load_user():
+    """Read user config file and return it as a dict."""
+    config_path, stamp = find_user_config()
+    if config_path is None:
+        # Let open() report the missing file
+        config_path = get_user_config_path()
+
+    if config_path.endswith('.toml'):
+        config = _load_toml(config_path)
+    elif config_path.endswith('.json'):
+        config = _load_json(config_path)
+    else:
+        config = _load_python(config_path, stamp)
 
     keys = list(config.keys())
     for k in keys:
@@ -1,9 +1,107 @@
+import functools
+
+from collections import ChainMap, OrderedDict
+from urllib.parse import urlparse
+
+from http_prompt.context.resolver import RefResolutionError, RefResolver
+from http_prompt.context.servers import ServerIndex, server_url
 from http_prompt.tree import Node
 
 
+def _path_tokens(base_path_tokens, path):
+    path_tokens = (base_path_tokens +
+                   list(filter(lambda s: s, path.split('/'))))
+    if path == '/':  # Path is a trailing slash
+        path_tokens.insert(len(base_path_tokens), '/')
+    elif path[-1] == '/':  # Path ends with a trailing slash
+        path_tokens[-1] = path_tokens[-1] + '/'
+    return path_tokens
+
+
+def _parameter_names(resolver, endpoint):
+    """Return the names of the non-path parameters of an endpoint, merged
+    from all its methods. Parameters that can't be resolved are skipped.
+    """
+    try:
+        endpoint = dict(resolver.resolve(endpoint))
+    except RefResolutionError:
+        return []
+    # path parameters (apply to all paths if not overriden)
+    global_parameters = list(endpoint.pop('parameters', []))
+    # not used
+    endpoint.pop('servers', None)
+    endpoint.pop('summary', None)
+    endpoint.pop('description', None)
+    names = []
+    for method, info in endpoint.items():
+        if not isinstance(info, dict):
+            continue
+        params = info.get('parameters', [])
+        for param in global_parameters + list(params):
+            try:
+                param = resolver.resolve(param)
+            except RefResolutionError:
+                continue
+            if not isinstance(param, dict) or 'name' not in param:
+                continue
+            if param.get('in') != 'path':
+                # Note that for completion mechanism, only
+                # name/node_type is used
+                # Parameters from methods/location
+                # are merged
+                names.append(param['name'])
+    return names
+
+
+def _load_paths(resolver, entries, node):
+    """Add the children of `node` from `entries`, a list of tuples
+    (tokens, path) where `tokens` are what remains of the spec `path` below
+    `node`. Each child directory gets a loader for its own entries, so
+    nothing below it is looked at until it is explored.
+    """
+    groups = OrderedDict()
+    endpoints = []
+    for tokens, path in entries:
+        if tokens:
+            groups.setdefault(tokens[0], []).append((tokens[1:], path))
+        else:
+            endpoints.append(path)
+
+    for name, child_entries in groups.items():
+        child = node.find_child(name, wildcard=False)
+        if not child:
+            child = Node(name, data={'type': 'dir'}, parent=node)
+            node.add_child(child)
+        child.loader = functools.partial(_load_paths, resolver,
+                                         child_entries)
+
+    for path in endpoints:
+        endpoint = resolver.spec['paths'][path]
+        for name in _parameter_names(resolver, endpoint):
+            node.add_path(name, node_type='file')
+
+
+def _load_spec(resolver, base_path, node):
+    base_path_tokens = list(filter(lambda s: s, base_path.split('/')))
+    entries = [(_path_tokens(base_path_tokens, path), path)
+               for path in resolver.spec['paths']]
+    _load_paths(resolver, entries, node)
+
+
+def _fields_equal(a, b):
+    # Contexts and context views are equal if their fields are
+    return (a.url == b.url and
+            a.headers == b.headers and
+            a.options == b.options and
+            a.querystring_params == b.querystring_params and
+            a.body_params == b.body_params and
+            a.body_json_params == b.body_json_params and
+            a.should_exit == b.should_exit)
+
+
 class Context(object):
 
-    def __init__(self, url=None, spec=None):
+    def __init__(self, url=None, spec=None, spec_url=None):
         self.url = url
         self.headers = {}
         self.querystring_params = {}
@@ -12,75 +110,39 @@ class Context(object):
         self.options = {}
         self.should_exit = False
 
-        # Create a tree for supporting API spec and ls command
+        # Index of the paths served from servers of their own (OpenAPI 3)
+        self.servers = None
+
+        # Create a tree for supporting API spec and ls command. The tree is
+        # only built as far as it is explored.
         self.root = Node('root')
         if spec:
-            if not self.url:
-                schemes = spec.get('schemes')
-                scheme = schemes[0] if schemes else 'https'
-                self.url = (scheme + '://' +
-                            spec.get('host', 'http://localhost:8000') +
-                            spec.get('basePath', ''))
-
-            base_path_tokens = list(filter(lambda s: s,
-                                    spec.get('basePath', '').split('/')))
-            paths = spec.get('paths')
-            if paths:
-                for path in paths:
-                    path_tokens = (base_path_tokens +
-                                   list(filter(lambda s: s, path.split('/'))))
-                    if path == '/':  # Path is a trailing slash
-                        path_tokens.insert(len(base_path_tokens), '/')
-                    elif path[-1] == '/':  # Path ends with a trailing slash
-                        path_tokens[-1] = path_tokens[-1] + '/'
-                    self.root.add_path(*path_tokens)
-                    endpoint = dict(paths[path])
-                    # path parameters (apply to all paths if not overriden)
-                    # exclude $ref as we have no system to handle that now
-                    global_parameters = list(endpoint.pop('parameters', []))
-                    # not used
-                    endpoint.pop('servers', None)
-                    endpoint.pop('$ref', None)
-                    endpoint.pop('summary', None)
-                    endpoint.pop('description', None)
-                    for method, info in endpoint.items():
-                        params = info.get('parameters', [])
-                        params = list(global_parameters + params)
-                        if params:
-                            def parameter_key(i): return (
-                                i.get('$ref', None),
-                                i.get('name', None),
-                                i.get('in', None)
-                            )
-                            # parameter is overriden based on $ref/in/name value
-                            # last value (local definition) takes precedence
-                            params_map = {parameter_key(p): p for p in params}
-                            params = params_map.values()
-                            for param in params:
-                                if param.get('$ref'):
-                                    for section in param.get('$ref').split('/'):
-                                        param = param.get(
-                                            section) if not section == '#' else spec
-
-                                if param.get('in') != 'path':
-                                    # Note that for completion mechanism, only
-                                    # name/node_type is used
-                                    # Parameters from methods/location
-                                    # are merged
-                                    full_path = path_tokens + [param['name']]
-                                    self.root.add_path(*full_path,
-                                                       node_type='file')
+            resolver = RefResolver(spec)
+            if spec.get('servers'):
+                # OpenAPI 3: paths are relative to the first server
+                default_url = server_url(spec['servers'][0], spec_url)
+                base_path = urlparse(default_url).path
+                self.servers = ServerIndex.from_spec(spec, resolver,
+                                                     default_url, spec_url)
+                if not self.url:
+                    self.url = default_url
+            else:
+                base_path = spec.get('basePath', '')
+                if not self.url:
+                    schemes = spec.get('schemes')
+                    scheme = schemes[0] if schemes else 'https'
+                    self.url = (scheme + '://' +
+                                spec.get('host', 'http://localhost:8000') +
+                                base_path)
+
+            if spec.get('paths'):
+                self.root.loader = functools.partial(_load_spec, resolver,
+                                                     base_path)
         elif not self.url:
             self.url = 'http://localhost:8000'
 
     def __eq__(self, other):
-        return (self.url == other.url and
-                self.headers == other.headers and
-                self.options == other.options and
-                self.querystring_params == other.querystring_params and
-                self.body_params == other.body_params and
-                self.body_json_params == other.body_json_params and
-                self.should_exit == other.should_exit)
+        return _fields_equal(self, other)
 
     def copy(self):
         context = Context(self.url)
@@ -90,6 +152,7 @@ class Context(object):
         context.body_json_params = self.body_json_params.copy()
         context.options = self.options.copy()
         context.should_exit = self.should_exit
+        context.servers = self.servers
         return context
 
     def update(self, context):
@@ -102,3 +165,39 @@ class Context(object):
         self.body_json_params.update(context.body_json_params)
         self.options.update(context.options)
         self.should_exit = self.should_exit
+
+
+class ContextView(object):
+    """Read-only view of a Context with another Context laid over it, as if
+    the base had been copied and updated with the override.
+
+    Nothing is copied: lookups go to the override first and then to the
+    base. Use copy() to get a standalone Context.
+    """
+
+    def __init__(self, base, override):
+        self.url = override.url or base.url
+        self.headers = ChainMap(override.headers, base.headers)
+        self.querystring_params = ChainMap(override.querystring_params,
+                                           base.querystring_params)
+        self.body_params = ChainMap(override.body_params, base.body_params)
+        self.body_json_params = ChainMap(override.body_json_params,
+                                         base.body_json_params)
+        self.options = ChainMap(override.options, base.options)
+        self.should_exit = base.should_exit
+        self.servers = base.servers
+        self.root = base.root
+
+    def __eq__(self, other):
+        return _fields_equal(self, other)
+
+    def copy(self):
+        context = Context(self.url)
+        context.headers = dict(self.headers)
+        context.querystring_params = dict(self.querystring_params)
+        context.body_params = dict(self.body_params)
+        context.body_json_params = dict(self.body_json_params)
+        context.options = dict(self.options)
+        context.should_exit = self.should_exit
+        context.servers = self.servers
+        return context
@@ -0,0 +1,64 @@
+"""Resolution of `$ref` references within an API spec."""
+
+from urllib.parse import unquote
+
+
+class RefResolutionError(ValueError):
+    pass
+
+
+def _unescape(token):
+    # JSON pointer escapes, see RFC 6901
+    return unquote(token).replace('~1', '/').replace('~0', '~')
+
+
+class RefResolver(object):
+    """Resolve the `$ref` references of a spec to the objects they point to.
+
+    Only references within the spec itself are supported, like
+    `#/parameters/page` in Swagger 2 or `#/components/parameters/page` in
+    OpenAPI 3. Every reference is resolved once and then cached, following
+    chains of references and detecting cycles along the way.
+    """
+
+    def __init__(self, spec):
+        self.spec = spec
+
+        # $ref => resolved object
+        self._cache = {}
+
+    def _lookup(self, ref):
+        if not ref.startswith('#'):
+            raise RefResolutionError('unsupported reference: %s' % ref)
+        obj = self.spec
+        for token in ref[1:].split('/')[1:]:
+            token = _unescape(token)
+            try:
+                if isinstance(obj, list):
+                    obj = obj[int(token)]
+                else:
+                    obj = obj[token]
+            except (KeyError, IndexError, TypeError, ValueError):
+                raise RefResolutionError('unresolvable reference: %s' % ref)
+        return obj
+
+    def resolve(self, obj):
+        """Return `obj`, or the object it refers to if it's a reference.
+        Raise RefResolutionError if the reference can't be resolved.
+        """
+        chain = []
+        while isinstance(obj, dict) and '$ref' in obj:
+            ref = obj['$ref']
+            if not isinstance(ref, str):
+                raise RefResolutionError('invalid reference: %r' % (ref,))
+            if ref in self._cache:
+                obj = self._cache[ref]
+                break
+            if ref in chain:
+                raise RefResolutionError('circular reference: %s' % ref)
+            chain.append(ref)
+            obj = self._lookup(ref)
+
+        for ref in chain:
+            self._cache[ref] = obj
+        return obj
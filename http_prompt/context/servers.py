@@ -0,0 +1,158 @@
+"""Base URLs from the `servers` of OpenAPI 3 specs."""
+
+import re
+
+from urllib.parse import urljoin, urlparse
+
+from http_prompt.context.resolver import RefResolutionError
+
+
+DEFAULT_URL = 'http://localhost:8000'
+
+RE_VARIABLE = re.compile(r'\{([^{}]*)\}')
+
+
+def server_url(server, spec_url=None):
+    """Return the URL of a server object, with its variables replaced by
+    their default values. Relative URLs are made absolute against the URL
+    the spec was fetched from, or DEFAULT_URL if it wasn't fetched over
+    HTTP.
+    """
+    variables = server.get('variables') or {}
+
+    def replace(match):
+        variable = variables.get(match.group(1)) or {}
+        return str(variable.get('default', match.group(0)))
+
+    url = RE_VARIABLE.sub(replace, server.get('url') or '/')
+    if '://' not in url:
+        if spec_url and urlparse(spec_url).scheme in ('http', 'https'):
+            url = urljoin(spec_url, url)
+        else:
+            url = DEFAULT_URL + '/' + url.lstrip('/')
+    return url.rstrip('/')
+
+
+def _is_wildcard(token):
+    return token.startswith('{') and token.endswith('}')
+
+
+def _split_path(path):
+    return [token for token in path.split('/') if token]
+
+
+class ServerIndex(object):
+    """Map the paths of a spec that declare their own `servers` to the
+    server URL they are served from.
+
+    The index is a trie of path segments relative to the default server
+    URL, where a `{param}` segment matches any segment, so looking up a URL
+    only takes as many steps as the URL has segments.
+    """
+
+    # Key of the trie nodes for a {param} segment
+    WILDCARD = '{}'
+
+    # Key of the server URL in the trie nodes
+    URL = None
+
+    def __init__(self, default_url):
+        self.default_url = default_url.rstrip('/')
+        seg = urlparse(self.default_url)
+        self._origin = (seg.scheme, seg.netloc)
+        self._base_tokens = _split_path(seg.path)
+        self._trie = {}
+        self._servers = set()
+
+    @classmethod
+    def from_spec(cls, spec, resolver, default_url, spec_url=None):
+        """Build the index from the per-path `servers` of a spec. Only path
+        items that are references are resolved, so indexing a large spec
+        stays cheap.
+        """
+        index = cls(default_url)
+        for path, endpoint in (spec.get('paths') or {}).items():
+            if isinstance(endpoint, dict) and '$ref' in endpoint:
+                try:
+                    endpoint = resolver.resolve(endpoint)
+                except RefResolutionError:
+                    continue
+            if isinstance(endpoint, dict) and endpoint.get('servers'):
+                index.add(path, server_url(endpoint['servers'][0],
+                                           spec_url))
+        return index
+
+    def __bool__(self):
+        return bool(self._trie)
+
+    def add(self, path, url):
+        node = self._trie
+        for token in _split_path(path):
+            if _is_wildcard(token):
+                token = self.WILDCARD
+            node = node.setdefault(token, {})
+        node[self.URL] = url.rstrip('/')
+        self._servers.add(node[self.URL])
+
+    def _lookup(self, tokens):
+        # Server of the longest path prefix matched by `tokens`
+        server = None
+        node = self._trie
+        for token in tokens:
+            child = node.get(token)
+            if child is None:
+                child = node.get(self.WILDCARD)
+                if child is None:
+                    break
+            node = child
+            server = node.get(self.URL, server)
+        return server
+
+    def resolve(self, url):
+        """Return `url` moved to the server of the longest path prefix it
+        matches, or unchanged if it's not on the default server or matches
+        no path with servers of its own.
+        """
+        seg = urlparse(url)
+        if (seg.scheme, seg.netloc) != self._origin:
+            return url
+        tokens = _split_path(seg.path)
+        base_len = len(self._base_tokens)
+        if tokens[:base_len] != self._base_tokens:
+            return url
+        tokens = tokens[base_len:]
+
+        server = self._lookup(tokens)
+        if not server:
+            return url
+        # Paths are relative to the server URL in OpenAPI 3
+        return _make_url(server, tokens, seg)
+
+    def to_default(self, url):
+        """Return `url` moved back from the server of a path to the default
+        server, or unchanged if it's not on a server of an indexed path.
+        This is the reverse of resolve().
+        """
+        seg = urlparse(url)
+        tokens = _split_path(seg.path)
+        for server in self._servers:
+            server_seg = urlparse(server)
+            if (server_seg.scheme, server_seg.netloc) != (seg.scheme,
+                                                          seg.netloc):
+                continue
+            server_tokens = _split_path(server_seg.path)
+            if tokens[:len(server_tokens)] != server_tokens:
+                continue
+            path_tokens = tokens[len(server_tokens):]
+            if self._lookup(path_tokens) == server:
+                return _make_url(self.default_url, path_tokens, seg)
+        return url
+
+
+def _make_url(base_url, tokens, seg):
+    url = base_url + '/' + '/'.join(tokens)
+    if seg.path.endswith('/') and tokens:
+        url += '/'
+    if seg.query:
+        url += '?' + seg.query
+    return url
@@ -1,11 +1,21 @@
 """Serialization and deserialization of a Context object."""
 
 import io
+import json
+import marshal
 import os
+import re
+import threading
 
+from time import monotonic
+
+import click
+
+from . import __version__
 from . import xdg
 from .context.transform import format_to_http_prompt
-from .execution import execute
+from .execution import execute, urljoin2
+from .utils import write_atomic
 
 
 # Don't save these HTTPie options to avoid collision with user config file
@@ -14,25 +24,252 @@ EXCLUDED_OPTIONS = ['--style']
 # Filename the current environment context will be saved to
 CONTEXT_FILENAME = 'context.hp'
 
+# Filename of the binary snapshot saved alongside the context file. It holds
+# the context fields, so they can be loaded with a single read.
+SNAPSHOT_FILENAME = 'context.snapshot'
+
+# Bump this whenever the snapshot layout changes
+SNAPSHOT_VERSION = 1
+
 
 def _get_context_filepath():
     dir_path = xdg.get_data_dir()
     return os.path.join(dir_path, CONTEXT_FILENAME)
 
 
+def _get_snapshot_filepath():
+    dir_path = xdg.get_data_dir()
+    return os.path.join(dir_path, SNAPSHOT_FILENAME)
+
+
+def _file_stamp(file_path):
+    stat = os.stat(file_path)
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def _read_snapshot():
+    """Read the snapshot file and return it as a dict. Return an empty dict
+    if the file is missing, unreadable or from a different version.
+    """
+    try:
+        with open(_get_snapshot_filepath(), 'rb') as f:
+            snapshot = marshal.load(f)
+    except (OSError, EOFError, ValueError, TypeError):
+        return {}
+    if (not isinstance(snapshot, dict) or
+            snapshot.get('version') != (SNAPSHOT_VERSION, __version__)):
+        return {}
+    return snapshot
+
+
+def _write_snapshot(**sections):
+    snapshot = dict(sections, version=(SNAPSHOT_VERSION, __version__))
+    write_atomic(_get_snapshot_filepath(), marshal.dumps(snapshot))
+
+
+def _context_to_snapshot(context):
+    options = {k: v for k, v in context.options.items()
+               if k not in EXCLUDED_OPTIONS}
+    # Loading context.hp executes one line per querystring value, so only
+    # the last value of each param survives. Mirror that here.
+    querystring_params = {k: v[-1:] for k, v in
+                          context.querystring_params.items()}
+    return (context.url, dict(context.headers), querystring_params,
+            dict(context.body_params), dict(context.body_json_params),
+            options)
+
+
+def _load_context_snapshot(context, file_path):
+    """Load a Context object in place from the snapshot if the snapshot was
+    taken from the current content of `file_path`. Return True on success.
+    """
+    section = _read_snapshot().get('context')
+    if not section:
+        return False
+    stamp, fields = section
+    try:
+        if tuple(stamp) != _file_stamp(file_path):
+            return False
+    except OSError:
+        return False
+
+    (url, headers, querystring_params, body_params, body_json_params,
+     options) = fields
+    context.url = url
+    context.headers.update(headers)
+    context.querystring_params.update(querystring_params)
+    context.body_params.update(body_params)
+    context.body_json_params.update(body_json_params)
+    context.options.update(options)
+    return True
+
+
+# Request items and cd commands as written by format_to_http_prompt(), either
+# unquoted or wrapped in single quotes by smart_quote(). Anything with
+# characters that have special meaning to the command grammar (escapes,
+# backticks, nested quotes) is left to execute().
+_UNQUOTED_KEY = r'[^\s\'"\\`=:>|\-][^\s\'"\\`=:>|]*'
+_UNQUOTED_VALUE = r'[^\s\'"\\`]*'
+_UNQUOTED_PATH = r'[^\s\'"\\`]+'
+_SQUOTED_KEY = r'[^\r\n\'\\`=:]+'
+_SQUOTED_VALUE = r'[^\r\n\'\\`]*'
+
+RE_UNQUOTED_ITEM = re.compile(
+    r"(%s)(:=|:|==|=)(%s)$" % (_UNQUOTED_KEY, _UNQUOTED_VALUE))
+RE_SQUOTED_ITEM = re.compile(
+    r"'(%s)(:=|:|==|=)(%s)'$" % (_SQUOTED_KEY, _SQUOTED_VALUE))
+RE_JSON_ITEM = re.compile(r"(%s):='(%s)'$" % (_UNQUOTED_KEY, _SQUOTED_VALUE))
+RE_CD = re.compile(r"cd\s+(?:(%s)|'(%s)')$" % (_UNQUOTED_PATH, _SQUOTED_VALUE))
+
+
+def _load_line(context, line):
+    """Apply a line written by format_to_http_prompt() to a Context object
+    directly, with the same effect as executing it. Return False if the line
+    isn't understood and has to be executed instead.
+    """
+    line = line.strip()
+    if not line:
+        return True
+
+    match = RE_CD.match(line)
+    if match:
+        path = match.group(1)
+        if path is None:
+            path = match.group(2)
+        try:
+            context.url = urljoin2(context.url, path)
+        except ValueError:
+            # Let execute() report the error
+            return False
+        return True
+
+    match = (RE_UNQUOTED_ITEM.match(line) or RE_SQUOTED_ITEM.match(line))
+    if match:
+        key, op, value = match.groups()
+    else:
+        match = RE_JSON_ITEM.match(line)
+        if not match:
+            return False
+        key, value = match.groups()
+        op = ':='
+
+    if op == ':=':
+        try:
+            context.body_json_params[key] = json.loads(value)
+        except ValueError:
+            # Let execute() report the error
+            return False
+    elif op == ':':
+        context.headers[key] = value
+    elif op == '=':
+        context.body_params[key] = value
+    else:
+        # Every executed line replaces the values of a querystring param
+        context.querystring_params[key] = [value]
+    return True
+
+
 def load_context(context, file_path=None):
     """Load a Context object in place from user data directory."""
     if not file_path:
         file_path = _get_context_filepath()
+        if _load_context_snapshot(context, file_path):
+            return
     if os.path.exists(file_path):
         with open(file_path, encoding='utf-8') as f:
             for line in f:
-                execute(line, context)
+                if not _load_line(context, line):
+                    execute(line, context)
 
 
 def save_context(context):
-    """Save a Context object to user data directory."""
+    """Save a Context object to user data directory.
+
+    Both the context file and its snapshot are written to temporary files
+    that are then renamed over the old ones, so a crash never leaves a
+    truncated file behind.
+    """
     file_path = _get_context_filepath()
     content = format_to_http_prompt(context, excluded_options=EXCLUDED_OPTIONS)
-    with open(file_path, 'w', encoding='utf-8') as f:
-        f.write(content)
+    write_atomic(file_path, content.encode('utf-8'))
+    _write_snapshot(context=(_file_stamp(file_path),
+                              _context_to_snapshot(context)))
+
+
+class ContextSaver(object):
+    """Save Context objects to user data directory in a background thread.
+
+    A snapshot of the context is taken on every save() call, but it is only
+    written once no further changes have been made for `delay` seconds, so a
+    burst of changes results in a single write. With a `delay` of 0, save()
+    writes the context synchronously.
+    """
+
+    def __init__(self, delay=0):
+        self.delay = delay
+
+        # The latest snapshot waiting to be written, and when to write it
+        self._pending = None
+        self._deadline = None
+
+        self._cond = threading.Condition()
+        self._write_lock = threading.Lock()
+        self._thread = None
+        self._closed = False
+
+    def save(self, context):
+        if not self.delay:
+            save_context(context)
+            return
+
+        snapshot = context.copy()
+        with self._cond:
+            self._pending = snapshot
+            self._deadline = monotonic() + self.delay
+            if not self._thread:
+                self._thread = threading.Thread(target=self._run)
+                self._thread.daemon = True
+                self._thread.start()
+            self._cond.notify()
+
+    def _write_pending(self):
+        # Holding the write lock while taking the snapshot ensures an older
+        # snapshot is never written over a newer one
+        with self._write_lock:
+            with self._cond:
+                context = self._pending
+                self._pending = None
+            if context:
+                save_context(context)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._closed:
+                    if self._pending is None:
+                        self._cond.wait()
+                        continue
+                    timeout = self._deadline - monotonic()
+                    if timeout <= 0:
+                        break
+                    self._cond.wait(timeout)
+                if self._closed:
+                    return
+            try:
+                self._write_pending()
+            except OSError as err:
+                click.secho('Could not save context: %s' % err, err=True,
+                            fg='red')
+
+    def flush(self):
+        """Write the pending snapshot now, if there is one."""
+        self._write_pending()
+
+    def close(self):
+        """Write the pending snapshot and stop the background thread."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        if self._thread:
+            self._thread.join()
+        self._write_pending()
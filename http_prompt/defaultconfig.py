@@ -24,3 +24,26 @@ set_cookies = 'auto'
 # When Vi mode is enabled, you use Vi-like keybindings to edit your commands.
 # When it is disabled, you use Emacs keybindings.
 vi = False
+
+# Connections to the same host are kept alive and reused across commands.
+# connection_pool_hosts is the number of hosts to keep connections for, and
+# connection_pool_maxsize is the maximum number of connections kept per host.
+connection_pool_hosts = 10
+connection_pool_maxsize = 10
+
+# Close kept-alive connections that have been idle for longer than this many
+# seconds. Set this to 0 to open a new connection for every request.
+connection_idle_timeout = 60
+
+# The current context is saved in the background after it changes. Changes
+# made within this many seconds of each other are saved together. Set this
+# to 0 to save the context right after every change.
+context_save_delay = 0.5
+
+# Print how long each request spends resolving the host name, connecting,
+# doing the TLS handshake, waiting for the first byte and in total. This can
+# also be turned on and off with the 'timing on' and 'timing off' commands.
+timing = False
+
+# Number of request timings kept for the 'timing' command to print
+timing_history = 100
@@ -0,0 +1,169 @@
+"""Run HTTPie in-process and get hold of the HTTP responses it receives.
+
+HTTPie's main() doesn't return the response object, so the engine hooks the
+factory HTTPie uses to build its requests.Session. While an engine is bound
+to the current thread, every session HTTPie builds gets a response hook that
+records the response in an Exchange object. No tracing is involved, so the
+request itself runs at native speed.
+
+The engine also keeps the transport adapters of the sessions it hands out,
+so their keep-alive connection pools are reused by later commands instead of
+paying for a new TCP and TLS handshake every time.
+
+With timing enabled, the engine records how long the phases of each request
+take, see timing.py.
+"""
+
+import threading
+
+from collections import deque
+from contextlib import contextmanager
+from time import monotonic
+
+import httpie.client
+import requests
+
+from requests.adapters import HTTPAdapter
+
+from . import timing
+
+
+_local = threading.local()
+_install_lock = threading.Lock()
+
+# The original session factory from HTTPie, set by _install()
+_build_requests_session = None
+
+
+def _build_session(*args, **kwargs):
+    binding = getattr(_local, 'binding', None)
+    if binding is None:
+        return _build_requests_session(*args, **kwargs)
+    engine, exchange = binding
+    return engine.build_session(exchange, *args, **kwargs)
+
+
+def _install():
+    global _build_requests_session
+    with _install_lock:
+        if _build_requests_session is None:
+            _build_requests_session = httpie.client.build_requests_session
+            httpie.client.build_requests_session = _build_session
+
+
+class Exchange(object):
+    """Responses received during a single HTTPie invocation."""
+
+    def __init__(self):
+        self.responses = []
+
+        # Timings of the requests made, if timing is enabled
+        self.timings = []
+
+    @property
+    def response(self):
+        """The final response, or None if no response was received."""
+        if self.responses:
+            return self.responses[-1]
+        return None
+
+    def response_hook(self, response, *args, **kwargs):
+        self.responses.append(response)
+
+
+class ConnectionPool(object):
+    """Transport adapters shared by the sessions built with the same
+    arguments.
+    """
+
+    def __init__(self, adapters):
+        self.adapters = adapters
+        self.last_used = monotonic()
+
+    def mount(self, session):
+        self.last_used = monotonic()
+        for prefix, adapter in self.adapters.items():
+            session.mount(prefix, adapter)
+
+    def close(self):
+        for adapter in self.adapters.values():
+            adapter.close()
+
+
+class RequestEngine(object):
+    """Provide HTTPie with requests sessions and capture its responses.
+
+    Connections are kept alive across commands for up to `idle_timeout`
+    seconds. `max_hosts` is the number of hosts to keep connection pools
+    for, and `max_connections` the number of connections kept per host.
+    Setting `idle_timeout` to 0 disables connection reuse.
+
+    If `timing` is true, the timings of the requests are recorded in the
+    exchanges, and the last `timing_history` of them are kept in `timings`.
+    """
+
+    def __init__(self, max_hosts=10, max_connections=10, idle_timeout=60,
+                 timing=False, timing_history=100):
+        _install()
+        self.max_hosts = max_hosts
+        self.max_connections = max_connections
+        self.idle_timeout = idle_timeout
+        self.timing = timing
+        self.timings = deque(maxlen=timing_history)
+
+        # Session factory arguments => ConnectionPool
+        self._pools = {}
+        self._lock = threading.Lock()
+
+    def _new_pool(self, *args, **kwargs):
+        session = _build_requests_session(*args, **kwargs)
+        for adapter in session.adapters.values():
+            if isinstance(adapter, HTTPAdapter):
+                adapter.init_poolmanager(self.max_hosts, self.max_connections,
+                                         block=adapter._pool_block)
+        timing.use_timed_pools(session.adapters.values())
+        return ConnectionPool(dict(session.adapters))
+
+    def _get_pool(self, *args, **kwargs):
+        key = (args, tuple(sorted(kwargs.items())))
+        with self._lock:
+            pool = self._pools.get(key)
+            if pool and monotonic() - pool.last_used > self.idle_timeout:
+                pool.close()
+                pool = None
+            if not pool:
+                pool = self._new_pool(*args, **kwargs)
+                self._pools[key] = pool
+            return pool
+
+    def build_session(self, exchange, *args, **kwargs):
+        if self.idle_timeout:
+            session = requests.Session()
+            self._get_pool(*args, **kwargs).mount(session)
+        else:
+            session = _build_requests_session(*args, **kwargs)
+            timing.use_timed_pools(session.adapters.values())
+        session.hooks['response'].append(exchange.response_hook)
+        return session
+
+    @contextmanager
+    def bind(self):
+        """Bind the engine to the current thread for the duration of the
+        with-block and yield an Exchange holding the responses received.
+        """
+        exchange = Exchange()
+        prev_binding = getattr(_local, 'binding', None)
+        _local.binding = (self, exchange)
+        try:
+            with timing.record(exchange.timings if self.timing else None):
+                yield exchange
+        finally:
+            _local.binding = prev_binding
+            self.timings.extend(exchange.timings)
+
+    def close(self):
+        """Close all the pooled connections."""
+        with self._lock:
+            for pool in self._pools.values():
+                pool.close()
+            self._pools.clear()
@@ -1,47 +1,70 @@
+import functools
 import io
 import json
+import pickle
 import re
 import os
 import sys
+import threading
 from urllib.parse import urlparse, urljoin
 
 import click
 
+from concurrent.futures import ThreadPoolExecutor
 from subprocess import CalledProcessError, Popen, PIPE
+from time import monotonic
 
 from httpie.context import Environment
-from httpie.core import main as httpie_main
+from httpie import core as httpie_core
+from parsimonious import expressions
 from parsimonious.exceptions import ParseError, VisitationError
 from parsimonious.grammar import Grammar
 from parsimonious.nodes import NodeVisitor
 from parsimonious.nodes import Node
 from pygments.token import String, Name
 
+from . import __version__
+from . import fastpath
+from . import xdg
 from .completion import ROOT_COMMANDS, ACTIONS, OPTION_NAMES, HEADER_NAMES
-from .context import Context
+from .context import Context, ContextView
 from .context.transform import (
     extract_args_for_httpie_main,
     format_to_curl,
     format_to_httpie,
     format_to_http_prompt)
-from .output import Printer, TextWriter
-from .utils import unescape, unquote, colformat
+from .engine import RequestEngine
+from .output import BufferedOutput, Printer, TextWriter
+from .utils import unescape, unquote, colformat, write_atomic
 
 
 HTTPIE_PROGRAM_NAME = 'http'
 
+# Maximum number of parse trees kept by parse()
+PARSE_CACHE_SIZE = 1024
 
-grammar = r"""
+# Bump this whenever the layout of the cached grammar changes
+GRAMMAR_CACHE_VERSION = 1
+
+# Buffer size of the files and pipes output is redirected to. Small writes
+# are gathered into large ones, while large writes go straight through.
+OUTPUT_BUFFER_SIZE = 256 * 1024
+
+
+grammar_source = r"""
     command = mutation / immutation
 
     mutation = concat_mut+ / nonconcat_mut
-    immutation = preview / action / ls / env / help / exit / exec / source / clear / _
+    immutation = preview / action / bench / ls / env / timing / help / exit / exec / source / clear / _
 
     concat_mut = option_mut / full_quoted_mut / value_quoted_mut / unquoted_mut
     nonconcat_mut = cd / rm
 
     preview = _ tool _ (method _)? (urlpath _)? concat_mut* redir_out? _
     action = _ method _ (urlpath _)? concat_mut* redir_out? _
+    bench = _ "bench" _ method _ bench_option* (urlpath _)? concat_mut*
+            redir_out? _
+    bench_option = ~r"-[nc]" _ ~r"[0-9]+" _
     urlpath = (~r"https?://" unquoted_string) /
               (!concat_mut !redir_out string)
 
@@ -50,7 +73,10 @@ grammar = r"""
     exit = _ "exit" _
     ls = _ "ls" _ (urlpath _)? (redir_out)?
     env  = _ "env" _ (redir_out)?
-    source = _ "source" _ filepath _
+    timing = _ "timing" _ (timing_switch _)? (redir_out)?
+    timing_switch = "on" / "off"
+    source = _ "source" _ (source_jobs _)? filepath _
+    source_jobs = "-j" _ ~r"[0-9]+"
     exec = _ "exec" _ filepath _
 
     redir_out = redir_append / redir_write / pipe
@@ -113,14 +139,15 @@ grammar = r"""
     escapeseq = ~r"\\."
     _ = ~r"\s*"
 
-    shell_subs = "`" shell_code "`"
+    shell_subs = "`" shell_code "`" shell_ttl?
     shell_code = ~r"[^`]*"
+    shell_ttl = ~r"@([0-9]+)([smh]?)(?=[\s'\"]|$)"
 """
 
 if sys.platform == 'win32':
     # XXX: Windows use backslashes as separators in its filesystem path, so we
     # have to avoid using backslashes to escape chars here.
-    grammar += r"""
+    grammar_source += r"""
         filepath = quoted_filepath / unquoted_filepath
         quoted_filepath = ('"' dquoted_filepath_char+ '"') /
                           ("'" squoted_filepath_char+ "'")
@@ -130,11 +157,66 @@ if sys.platform == 'win32':
         unquoted_filepath_char = ~r"[^\s\"]"
     """
 else:
-    grammar += r"""
+    grammar_source += r"""
         filepath = string
     """
 
-grammar = Grammar(grammar)
+
+def _get_grammar_cache_key():
+    # The compiled grammar depends on the platform through `filepath`, and
+    # can only be unpickled by the same parsimonious and pickle protocol
+    stat = os.stat(expressions.__file__)
+    return (GRAMMAR_CACHE_VERSION, __version__, sys.platform,
+            tuple(sys.version_info[:2]), stat.st_mtime_ns, stat.st_size,
+            grammar_source)
+
+
+def load_grammar():
+    """Load the compiled command grammar from the data directory, or compile
+    and save it there if it isn't cached or the cache is stale.
+    """
+    try:
+        key = _get_grammar_cache_key()
+        file_path = os.path.join(xdg.get_data_dir(), 'grammar')
+    except OSError:
+        return Grammar(grammar_source)
+
+    try:
+        with open(file_path, 'rb') as f:
+            cached_key, grammar = pickle.load(f)
+        if cached_key == key:
+            return grammar
+    except Exception:
+        # Missing, truncated, or written by an incompatible version
+        pass
+
+    grammar = Grammar(grammar_source)
+    try:
+        write_atomic(file_path, pickle.dumps(
+            (key, grammar), protocol=pickle.HIGHEST_PROTOCOL))
+    except OSError:
+        pass
+    return grammar
+
+
+@functools.lru_cache(maxsize=None)
+def get_grammar():
+    """Return the command grammar, loading it on first use rather than when
+    this module is imported.
+    """
+    return load_grammar()
+
+
+@functools.lru_cache(maxsize=PARSE_CACHE_SIZE)
+def parse(command):
+    """Parse a command into a parse tree, caching the most recently used
+    trees by command text. Use parse.cache_info() for hit/miss counters.
+
+    Shell substitutions are run when a tree is visited, not when it is parsed,
+    so commands containing backticks are still re-evaluated on each run,
+    unless a substitution has a time to live (`cmd`@60s).
+    """
+    return get_grammar().parse(command)
 
 
 if Environment.colors == 256:
@@ -187,27 +269,152 @@ class DummyExecutionListener(object):
         pass
 
 
+# HTTPie parses its arguments with a module-level parser that keeps the
+# arguments of the call in progress, so only one thread may parse at a time
+_httpie_parser_lock = threading.Lock()
+
+
+class _SerializedParser(object):
+    """Wrap HTTPie's argument parser so threads take turns parsing."""
+
+    def __init__(self, parser):
+        self._parser = parser
+
+    def parse_args(self, *args, **kwargs):
+        with _httpie_parser_lock:
+            return self._parser.parse_args(*args, **kwargs)
+
+
+def httpie_main(args, env):
+    """Run HTTPie like its main() does. Requests made from several threads
+    at once only wait for each other while their arguments are parsed.
+    """
+    if not hasattr(httpie_core, 'raw_main'):
+        # HTTPie < 3.0 can't be given a parser, so run whole calls in turn
+        with _httpie_parser_lock:
+            return httpie_core.main(args, env=env)
+
+    from httpie.cli.definition import parser
+    return httpie_core.raw_main(parser=_SerializedParser(parser),
+                                main_program=httpie_core.program,
+                                args=args, env=env)
+
+
+class RecordingListener(DummyExecutionListener):
+    """Keep the responses returned, to pass them on to another listener
+    later.
+    """
+
+    def __init__(self):
+        self.responses = []
+
+    def response_returned(self, context, response):
+        self.responses.append(response)
+
+
+def is_independent_action(command):
+    """Return True if `command` is an HTTP action that neither changes the
+    context nor redirects its output, so it can run alongside other such
+    actions.
+    """
+    fast_command = fastpath.recognize(command)
+    if fast_command:
+        return fast_command.name == 'action'
+    try:
+        root = parse(command)
+    except ParseError:
+        return False
+    node = root.children[0]
+    if node.expr_name != 'immutation':
+        return False
+    node = node.children[0]
+    if node.expr_name != 'action':
+        return False
+    # action = _ method _ (urlpath _)? concat_mut* redir_out? _
+    return not node.children[5].text
+
+
+class ShellSubsCache(object):
+    """Outputs of shell substitutions, kept for as long as they were asked
+    to be, as in `get-token`@60s.
+    """
+
+    def __init__(self):
+        # Shell command => (expiry time, output)
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, cmd):
+        """Return the unexpired output of `cmd`, or None."""
+        with self._lock:
+            entry = self._entries.get(cmd)
+            if entry is None:
+                return None
+            if entry[0] <= monotonic():
+                del self._entries[cmd]
+                return None
+            return entry[1]
+
+    def set(self, cmd, output, ttl):
+        with self._lock:
+            self._entries[cmd] = (monotonic() + ttl, output)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+shell_subs_cache = ShellSubsCache()
+
+TTL_UNITS = {'': 1, 's': 1, 'm': 60, 'h': 3600}
+
+
+def _parse_ttl(text):
+    match = re.match(r'@([0-9]+)([smh]?)$', text)
+    return int(match.group(1)) * TTL_UNITS[match.group(2)]
+
+
+def _iter_shell_subs(node):
+    if node.expr_name == 'shell_subs':
+        yield node
+    else:
+        for child in node.children:
+            yield from _iter_shell_subs(child)
+
+
 class ExecutionVisitor(NodeVisitor):
 
     unwrapped_exceptions = (CalledProcessError,)
 
-    def __init__(self, context, listener=None, style=None):
+    def __init__(self, context, listener=None, style=None, engine=None,
+                 output=None):
         super(ExecutionVisitor, self).__init__()
         self.context = context
 
         self.context_override = Context(context.url)
         self.method = None
         self.tool = None
-        self._output = Printer()
+        self.bench_options = {}
+        self.source_jobs = 1
+        self._output = output or Printer()
 
         # If there's a pipe, as in "httpie post | sed s/POST/GET/", this
-        # variable points to the "sed" Popen object. The variable is necessary
-        # because the we need to redirect Popen.stdout to Printer, which does
-        # output pagination.
+        # variable points to the "sed" Popen object, and pipe_thread to the
+        # thread that streams its stdout to Printer, which does output
+        # pagination, while its stdin is being written.
         self.pipe_proc = None
+        self.pipe_thread = None
+
+        # Parse tree node id => Popen object of a shell substitution started
+        # ahead of the visit by start_shell_subs()
+        self._shell_procs = {}
 
         self.listener = listener or DummyExecutionListener()
 
+        # Runs HTTPie and captures the responses it receives. Connections
+        # are only kept alive across commands if the caller owns an engine.
+        self.engine = engine or RequestEngine(idle_timeout=0)
+
         # Last response object returned by HTTPie
         self.last_response = None
 
@@ -231,27 +438,43 @@ class ExecutionVisitor(NodeVisitor):
         self.method = node.text
         return node
 
+    def _join_url(self, path):
+        servers = self.context.servers
+        url = self.context_override.url
+        if servers:
+            # Join paths on the default server, so that .. leads back from
+            # the server of a path
+            url = servers.to_default(url)
+        url = urljoin2(url, path)
+        if servers:
+            # Move to the server the path is served from, if it has its own
+            url = servers.resolve(url)
+        self.context_override.url = url
+
     def visit_urlpath(self, node, children):
-        path = node.text
-        self.context_override.url = urljoin2(self.context_override.url, path)
+        self._join_url(node.text)
         return node
 
-    def visit_cd(self, node, children):
-        _, _, _, path, _ = children
-
-        if isinstance(path, Node):
+    def _cd(self, path):
+        if path is None:
             seg = urlparse(self.context_override.url)
             self.context_override.url = seg.scheme + '://' + seg.netloc
         else:
-            self.context_override.url = urljoin2(
-                self.context_override.url, path)
+            self._join_url(path)
 
+    def visit_cd(self, node, children):
+        _, _, _, path, _ = children
+        self._cd(None if isinstance(path, Node) else path)
         return node
 
     def visit_rm(self, node, children):
         children = children[0]
         kind = children[3].text
+        name = children[5] if kind != '*' else None
+        self._rm(kind, name)
+        return node
 
+    def _rm(self, kind, name):
         if kind == '*':
             # Clear context
             for target in [self.context.headers,
@@ -260,9 +483,8 @@ class ExecutionVisitor(NodeVisitor):
                            self.context.body_json_params,
                            self.context.options]:
                 target.clear()
-            return node
+            return
 
-        name = children[5]
         if kind == '-h':
             target = self.context.headers
         elif kind == '-q':
@@ -280,22 +502,21 @@ class ExecutionVisitor(NodeVisitor):
                     del self.context.body_params[name]
                 except KeyError:
                     del self.context.body_json_params[name]
-            return node
+            return
 
         if name == '*':
             target.clear()
         else:
             del target[name]
 
-        return node
-
     def visit_help(self, node, children):
         self.output.write(generate_help_text())
         return node
 
     def _redirect_output(self, filepath, mode):
-        filepath = normalize_filepath(filepath)
-        self.output = TextWriter(open(os.path.expandvars(filepath), mode))
+        filepath = os.path.expandvars(normalize_filepath(filepath))
+        self.output = TextWriter(
+            open(filepath, mode, buffering=OUTPUT_BUFFER_SIZE), name=filepath)
 
     def visit_redir_append(self, node, children):
         self._redirect_output(children[3], 'ab')
@@ -307,26 +528,81 @@ class ExecutionVisitor(NodeVisitor):
 
     def visit_pipe(self, node, children):
         cmd = children[3]
-        self.pipe_proc = Popen(cmd, shell=True, stdin=PIPE, stdout=PIPE)
+        self.pipe_proc = Popen(cmd, shell=True, stdin=PIPE, stdout=PIPE,
+                               bufsize=OUTPUT_BUFFER_SIZE)
         self.output = TextWriter(self.pipe_proc.stdin)
+        self.pipe_thread = threading.Thread(
+            target=_pump,
+            args=(self.pipe_proc.stdout, Printer().open_stream()))
+        self.pipe_thread.daemon = True
+        self.pipe_thread.start()
         return node
 
     def visit_exec(self, node, children):
         path = normalize_filepath(children[3])
         with open(path, encoding='utf-8') as f:
             # Wipe out context first
-            execute('rm *', self.context, self.listener)
+            execute('rm *', self.context, self.listener, engine=self.engine)
             for line in f:
-                execute(line, self.context, self.listener)
+                execute(line, self.context, self.listener,
+                        engine=self.engine)
+        return node
+
+    def visit_source_jobs(self, node, children):
+        self.source_jobs = int(children[2].text)
         return node
 
     def visit_source(self, node, children):
-        path = normalize_filepath(children[3])
+        path = normalize_filepath(children[4])
         with open(path, encoding='utf-8') as f:
-            for line in f:
-                execute(line, self.context, self.listener)
+            if self.source_jobs > 1:
+                self._source_concurrently(f, self.source_jobs)
+            else:
+                for line in f:
+                    execute(line, self.context, self.listener,
+                            engine=self.engine)
         return node
 
+    def _execute_isolated(self, line):
+        output = BufferedOutput()
+        listener = RecordingListener()
+        execute(line, self.context, listener, engine=self.engine,
+                output=output)
+        return output, listener.responses
+
+    def _finish_isolated(self, futures):
+        responses = []
+        for future in futures:
+            output, future_responses = future.result()
+            data = output.getvalue()
+            if data:
+                Printer().write(data)
+            responses += future_responses
+
+        # The listener may change the context, so it's only told about the
+        # responses once all the requests sharing the context are done
+        for response in responses:
+            self.listener.response_returned(self.context, response)
+
+    def _source_concurrently(self, lines, jobs):
+        """Execute lines like source does, but run consecutive actions that
+        don't change the context on up to `jobs` threads at once. Any other
+        line waits for the actions before it to finish. The output of the
+        actions is printed in the order they appear in.
+        """
+        with ThreadPoolExecutor(max_workers=jobs) as pool:
+            futures = []
+            for line in lines:
+                if not line.strip():
+                    continue
+                if is_independent_action(line):
+                    futures.append(pool.submit(self._execute_isolated, line))
+                    continue
+                self._finish_isolated(futures)
+                futures = []
+                execute(line, self.context, self.listener, engine=self.engine)
+            self._finish_isolated(futures)
+
     def _colorize(self, text, token_type):
         if not self.formatter:
             return text
@@ -336,7 +612,11 @@ class ExecutionVisitor(NodeVisitor):
         return out.getvalue()
 
     def visit_ls(self, node, children):
-        path = urlparse(self.context_override.url).path
+        url = self.context_override.url
+        if self.context.servers:
+            # The tree follows the paths on the default server
+            url = self.context.servers.to_default(url)
+        path = urlparse(url).path
         path = filter(None, path.split('/'))
         nodes = self.context.root.ls(*path)
         if self.output.isatty():
@@ -357,6 +637,16 @@ class ExecutionVisitor(NodeVisitor):
         self.output.write(text)
         return node
 
+    def visit_timing(self, node, children):
+        switch = children[3]
+        if isinstance(switch, list):
+            self.engine.timing = switch[0].text == 'on'
+        else:
+            text = ''.join(timing.format() + '\n'
+                           for timing in self.engine.timings)
+            self.output.write(text)
+        return node
+
     def visit_exit(self, node, children):
         self.context.should_exit = True
         return node
@@ -477,42 +767,47 @@ class ExecutionVisitor(NodeVisitor):
         return node
 
     def _final_context(self):
-        context = self.context.copy()
-        context.update(self.context_override)
-        return context
-
-    def _trace_get_response(self, frame, event, arg):
-        func_name = frame.f_code.co_name
-        if func_name == 'get_response':
-            if event == 'call':
-                return self._trace_get_response
-            elif event == 'return':
-                self.last_response = arg
+        # The context with the changes made by this command, without copying
+        return ContextView(self.context, self.context_override)
 
     def _call_httpie_main(self):
         context = self._final_context()
         args = extract_args_for_httpie_main(context, self.method)
-        env = Environment(stdout=self.output, stdin=sys.stdin,
+
+        # Stream the response to the pager as it's received, rather than
+        # passing all of it to the pager at once
+        output = self.output
+        if isinstance(output, Printer):
+            output = output.open_stream()
+        env = Environment(stdout=output, stdin=sys.stdin,
                           is_windows=False)
-        env.stdout_isatty = self.output.isatty()
+        env.stdout_isatty = output.isatty()
         env.stdin_isatty = sys.stdin.isatty()
 
-        # XXX: httpie_main() doesn't provide an API for us to get the
-        # HTTP response object, so we use this super dirty hack -
-        # sys.settrace() to intercept get_response() that is called in
-        # httpie_main() internally. The HTTP response intercepted is
-        # assigned to self.last_response, which self.listener may be
-        # interested in.
-        sys.settrace(self._trace_get_response)
+        # httpie_main() doesn't provide an API for us to get the HTTP
+        # response object, so the engine hooks the requests session HTTPie
+        # builds and records the responses in an exchange. The final
+        # response is assigned to self.last_response, which self.listener
+        # may be interested in.
         try:
-            httpie_main([HTTPIE_PROGRAM_NAME, *args], env=env)
+            with self.engine.bind() as exchange:
+                httpie_main([HTTPIE_PROGRAM_NAME, *args], env=env)
         finally:
-            sys.settrace(None)
+            if output is not self.output:
+                output.close()
+        self.last_response = exchange.response
+        if exchange.timings:
+            click.secho(exchange.timings[-1].format(), err=True, fg='cyan')
 
     def visit_immutation(self, node, children):
-        self.output.close()
+        try:
+            self.output.close()
+        except BrokenPipeError:
+            # The command exited without reading all of its input
+            pass
         if self.pipe_proc:
-            Printer().write(self.pipe_proc.stdout.read())
+            self.pipe_thread.join()
+            self.pipe_proc.wait()
         return node
 
     def visit_preview(self, node, children):
@@ -531,10 +826,86 @@ class ExecutionVisitor(NodeVisitor):
             self.listener.response_returned(self.context, self.last_response)
         return node
 
+    def visit_bench_option(self, node, children):
+        flag, _, num, _ = children
+        self.bench_options[flag.text] = int(num.text)
+        return node
+
+    def visit_bench(self, node, children):
+        # Building HTTPie's argument parser is slow, so only do it when
+        # benchmarking
+        from .bench import Benchmark
+
+        options = self.bench_options
+        context = self._final_context()
+        args = extract_args_for_httpie_main(context, self.method)
+        try:
+            benchmark = Benchmark(args, num_requests=options.get('-n', 100),
+                                  concurrency=options.get('-c', 1))
+        except SystemExit:
+            # HTTPie has already reported the invalid arguments
+            return node
+        self.output.write(benchmark.run().format())
+        return node
+
+    def execute_fast(self, command):
+        """Execute a fastpath.Command the same way visiting its parse tree
+        would.
+        """
+        name, args = command
+        if name == 'action':
+            method, path = args
+            self.method = method
+            if path:
+                self._join_url(path)
+            self.visit_action(None, None)
+            self.visit_immutation(None, None)
+            return
+
+        if name == 'mutate':
+            for key, op, val in args:
+                self._mutate(None, key, op, val)
+        elif name == 'cd':
+            self._cd(*args)
+        else:
+            assert name == 'rm'
+            self._rm(*args)
+        self.visit_mutation(None, None)
+
+    def start_shell_subs(self, root):
+        """Start all the shell substitutions in a parse tree at once, so they
+        run in parallel rather than one after another as the tree is
+        visited. Cached outputs are not run again.
+        """
+        for node in _iter_shell_subs(root):
+            cmd = node.children[1].text
+            ttl_node = node.children[3]
+            if ttl_node.text and shell_subs_cache.get(cmd) is not None:
+                continue
+            self._shell_procs[id(node)] = Popen(cmd, shell=True,
+                                                stdout=PIPE)
+
+    def wait_shell_subs(self):
+        """Wait for the shell substitutions left unvisited by an error."""
+        while self._shell_procs:
+            self._shell_procs.popitem()[1].communicate()
+
     def visit_shell_subs(self, node, children):
         cmd = children[1]
-        p = Popen(cmd, shell=True, stdout=PIPE)
-        return p.stdout.read().decode().rstrip()
+        ttl_text = node.children[3].text
+        ttl = _parse_ttl(ttl_text) if ttl_text else None
+        if ttl is not None:
+            output = shell_subs_cache.get(cmd)
+            if output is not None:
+                return output
+
+        p = self._shell_procs.pop(id(node), None)
+        if p is None:
+            p = Popen(cmd, shell=True, stdout=PIPE)
+        output = p.communicate()[0].decode().rstrip()
+        if ttl is not None:
+            shell_subs_cache.set(cmd, output, ttl)
+        return output
 
     def visit_shell_code(self, node, children):
         return node.text
@@ -547,35 +918,67 @@ class ExecutionVisitor(NodeVisitor):
         return node
 
 
-def execute(command, context, listener=None, style=None):
+def _pump(src, dest):
+    """Copy a binary stream to another as data arrives, then close both."""
+    try:
+        while True:
+            data = src.read1(OUTPUT_BUFFER_SIZE)
+            if not data:
+                break
+            dest.write(data)
+    finally:
+        src.close()
+        dest.close()
+
+
+def _secho_exception(exc_class, msg):
+    if exc_class is KeyError:
+        # XXX: Need to parse the error message to get the original error
+        # message as VisitationError doesn't hold the original exception
+        # object
+        key = re.search(r"KeyError: u?'(.*)'", msg).group(1)
+        click.secho("Key '%s' not found" % key, err=True, fg='red')
+    elif issubclass(exc_class, OSError):
+        msg = msg.splitlines()[0]
+
+        # Remove the exception class name at the beginning
+        msg = msg[msg.find(':') + 2:]
+        click.secho(msg, err=True, fg='red')
+    else:
+        # TODO: Better error message
+        click.secho(msg, err=True, fg='red')
+
+
+def execute(command, context, listener=None, style=None, engine=None,
+            output=None):
+    # Common command shapes skip the full parser
+    fast_command = fastpath.recognize(command)
+    if fast_command:
+        visitor = ExecutionVisitor(context, listener=listener, style=style,
+                                   engine=engine, output=output)
+        try:
+            visitor.execute_fast(fast_command)
+        except Exception as err:
+            _secho_exception(type(err),
+                             '%s: %s' % (type(err).__name__, err))
+        return
+
     try:
-        root = grammar.parse(command)
+        root = parse(command)
     except ParseError as err:
         # TODO: Better error message
         part = command[err.pos:err.pos + 10]
         click.secho('Syntax error near "%s"' % part, err=True, fg='red')
     else:
-        visitor = ExecutionVisitor(context, listener=listener, style=style)
+        visitor = ExecutionVisitor(context, listener=listener, style=style,
+                                   engine=engine, output=output)
         try:
+            visitor.start_shell_subs(root)
             visitor.visit(root)
         except VisitationError as err:
-            exc_class = err.original_class
-            if exc_class is KeyError:
-                # XXX: Need to parse VisitationError error message to get the
-                # original error message as VisitationError doesn't hold the
-                # original exception object
-                key = re.search(r"KeyError: u?'(.*)'", str(err)).group(1)
-                click.secho("Key '%s' not found" % key, err=True,
-                            fg='red')
-            elif issubclass(exc_class, OSError):
-                msg = str(err).splitlines()[0]
-
-                # Remove the exception class name at the beginning
-                msg = msg[msg.find(':') + 2:]
-                click.secho(msg, err=True, fg='red')
-            else:
-                # TODO: Better error message
-                click.secho(str(err), err=True, fg='red')
+            _secho_exception(err.original_class, str(err))
         except CalledProcessError as err:
             click.secho(err.output + ' (exit status %d)' % err.returncode,
                         fg='red')
+        finally:
+            visitor.wait_shell_subs()
@@ -0,0 +1,72 @@
+"""Linear-time recognizer for the most common command shapes.
+
+Lines like `Accept:application/json`, `get /users`, `cd /orgs` or
+`rm -h Accept` are recognized with a few regular expressions instead of the
+PEG grammar in execution.py. Anything that could involve quoting, escaping,
+shell substitution, redirection, HTTPie options or JSON values is left to the
+full parser, so a recognized command always means the same as it would to
+the grammar.
+"""
+
+import re
+
+from collections import namedtuple
+
+
+# A recognized command. `name` is one of 'mutate', 'action', 'cd' and 'rm'.
+Command = namedtuple('Command', ['name', 'args'])
+
+METHODS = ('get', 'head', 'post', 'put', 'delete', 'patch', 'options',
+           'connect')
+
+# Characters that may change the meaning of a token under the full grammar
+_SPECIAL = r'\s\'"\\`'
+
+RE_WHITESPACE = re.compile(r'\s+')
+
+# `:=` is deliberately not accepted as its value has to be valid JSON
+RE_MUTATION = re.compile(
+    r'([^%s=:>|\-][^%s=:>|]*)(:(?!=)|==|=)([^%s]*)$' %
+    (_SPECIAL, _SPECIAL, _SPECIAL))
+
+RE_ACTION = re.compile(
+    r'([a-zA-Z]+)(?:\s+(https?://[^%s>|]+|[^%s=:>|\-][^%s=:>|]*))?$' %
+    (_SPECIAL, _SPECIAL, _SPECIAL))
+
+RE_CD = re.compile(r'cd(?:\s+([^%s]+))?$' % _SPECIAL)
+
+RE_RM = re.compile(r'rm\s+(?:(\*)|(-[hqbo])\s+([^%s=:>]+))$' % _SPECIAL)
+
+
+def recognize(command):
+    """Return a Command if `command` has one of the common shapes the fast
+    path understands, or None if it needs the full parser.
+    """
+    command = command.strip()
+    if not command:
+        return None
+
+    match = RE_CD.match(command)
+    if match:
+        return Command('cd', (match.group(1),))
+
+    match = RE_RM.match(command)
+    if match:
+        if match.group(1):
+            return Command('rm', ('*', None))
+        return Command('rm', (match.group(2), match.group(3)))
+
+    match = RE_ACTION.match(command)
+    if match:
+        method = match.group(1)
+        if method.lower() in METHODS:
+            return Command('action', (method, match.group(2)))
+        return None
+
+    mutations = []
+    for token in RE_WHITESPACE.split(command):
+        match = RE_MUTATION.match(token)
+        if not match:
+            return None
+        mutations.append(match.groups())
+    return Command('mutate', mutations)
@@ -2,7 +2,7 @@ from pygments.lexer import (RegexLexer, bygroups, words, using, include,
                             combined)
 from pygments.lexers import BashLexer
 
-from pygments.token import Text, String, Keyword, Name, Operator
+from pygments.token import Text, String, Keyword, Name, Operator, Number
 
 from . import options as opt
 
@@ -48,12 +48,16 @@ class HttpPromptLexer(RegexLexer):
             (words(HTTP_METHODS, prefix='(?i)', suffix=r'(?!\S)(\s*)'),
              bygroups(Keyword, Text), combined('redir_out', 'urlpath')),
 
+            (r'(bench)(\s*)', bygroups(Keyword, Text), 'bench'),
+
             (r'(clear)(\s*)', bygroups(Keyword, Text), 'end'),
             (r'(exit)(\s*)', bygroups(Keyword, Text), 'end'),
             (r'(help)(\s)*', bygroups(Keyword, Text), 'end'),
             (r'(env)(\s*)', bygroups(Keyword, Text),
              combined('redir_out', 'pipe')),
-            (r'(source)(\s*)', bygroups(Keyword, Text), 'file_path'),
+            (r'(timing)(\s*)', bygroups(Keyword, Text),
+             combined('timing_switch', 'redir_out', 'pipe')),
+            (r'(source)(\s*)', bygroups(Keyword, Text), 'source'),
             (r'(exec)(\s*)', bygroups(Keyword, Text), 'file_path'),
             (r'(ls)(\s*)', bygroups(Keyword, Text),
              combined('redir_out', 'urlpath')),
@@ -68,8 +72,30 @@ class HttpPromptLexer(RegexLexer):
         ],
         'rm_name': string_rules('end'),
 
+        'bench': [
+            (words(HTTP_METHODS, prefix='(?i)', suffix=r'(?!\S)(\s*)'),
+             bygroups(Keyword, Text), 'bench_option')
+        ],
+        'bench_option': [
+            (r'(\-[nc])(\s+)([0-9]+)(\s*)',
+             bygroups(Name, Text, String, Text)),
+            (r'', Text, combined('redir_out', 'urlpath'))
+        ],
+
+        'source': [
+            (r'(\-j)(\s+)([0-9]+)(\s*)', bygroups(Name, Text, String, Text),
+             'file_path'),
+            (r'', Text, 'file_path')
+        ],
+
+        'timing_switch': [
+            (r'(on|off)(\s*)', bygroups(Name, Text),
+             combined('redir_out', 'pipe'))
+        ],
+
         'shell_command': [
-            (r'(`)([^`]*)(`)', bygroups(Text, using(BashLexer), Text)),
+            (r'(`)([^`]*)(`)(@[0-9]+[smh]?(?=[\s\'"]|$))?',
+             bygroups(Text, using(BashLexer), Text, Number)),
         ],
         'pipe': [
             (r'(\s*)(\|)(.*)', bygroups(Text, Operator, using(BashLexer))),
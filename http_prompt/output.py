@@ -1,7 +1,14 @@
+import codecs
+import queue
 import sys
+import threading
+
+from time import monotonic
 
 import click
 
+from httpie.utils import humanize_bytes
+
 
 class Printer(object):
     """Wrap click.echo_via_pager() so it accepts binary data."""
@@ -29,24 +36,159 @@ class Printer(object):
     def clear(self):
         click.clear()
 
+    def open_stream(self):
+        """Return a PagerStream that writes to the same pager."""
+        return PagerStream()
+
+
+class PagerStream(object):
+    """File-like object that feeds the data written to it to the pager as it
+    arrives, instead of all at once, so large or slow responses are shown
+    as they are received.
+
+    The pager runs in a background thread, reading from a bounded queue, so
+    only a few chunks are held in memory at any time. If the pager exits
+    early, e.g. because the user quit it, the rest of the data is discarded.
+    """
+
+    def __init__(self, max_chunks=64):
+        self._queue = queue.Queue(maxsize=max_chunks)
+        self._thread = None
+        self._done = threading.Event()
+
+    def _chunks(self):
+        decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+
+        # Trailing whitespace is held back until more text follows, as
+        # echo_via_pager() appends a '\n' at the end (#89)
+        pending = ''
+        while True:
+            data = self._queue.get()
+            final = data is None
+            text = pending + decoder.decode(data or b'', final=final)
+            body = text.rstrip()
+            pending = text[len(body):]
+            if body:
+                yield body
+            if final:
+                return
+
+    def _run(self):
+        try:
+            click.echo_via_pager(self._chunks())
+        finally:
+            self._done.set()
+
+    def _put(self, data):
+        # Don't block forever if the pager is gone
+        while not self._done.is_set():
+            try:
+                self._queue.put(data, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+
+    def write(self, data):
+        if isinstance(data, str):
+            data = data.encode()
+        if not data:
+            return
+        if not self._thread:
+            self._thread = threading.Thread(target=self._run)
+            self._thread.daemon = True
+            self._thread.start()
+        self._put(data)
+
+    def flush(self):
+        # Every write is passed on to the pager right away
+        pass
+
+    def close(self):
+        """Wait for the pager to show everything written and exit."""
+        if self._thread:
+            self._put(None)
+            self._thread.join()
+            self._thread = None
+
+    def isatty(self):
+        return True
+
+    def fileno(self):
+        return sys.stdout.fileno()
+
+    def clear(self):
+        click.clear()
+
+
+class TransferProgress(object):
+    """Show on stderr how much data has been written to a file, once the
+    transfer is large enough for it to take a while.
+    """
+
+    # Bytes written before progress is shown
+    THRESHOLD = 1024 * 1024
+
+    # Seconds between updates
+    INTERVAL = 0.25
+
+    def __init__(self, name, stream=None):
+        self.name = name
+        self.stream = stream or sys.stderr
+        self.total = 0
+        self._shown = False
+        self._last_update = 0
+
+    def update(self, num_bytes):
+        self.total += num_bytes
+        if self.total < self.THRESHOLD:
+            return
+        now = monotonic()
+        if now - self._last_update >= self.INTERVAL:
+            self._last_update = now
+            self._show()
+
+    def _show(self):
+        self._shown = True
+        self.stream.write('\rWriting %s: %s' % (self.name,
+                                                humanize_bytes(self.total)))
+        self.stream.flush()
+
+    def finish(self):
+        if self._shown:
+            self._show()
+            self.stream.write('\n')
+            self.stream.flush()
+
 
 class TextWriter(object):
     """Wrap a file-like object, opened with 'wb' or 'ab', so it accepts text
     data.
+
+    Binary data, which is what HTTPie writes, goes to the file as is, in the
+    chunks HTTPie reads from the response. If `name` is given and stderr is
+    a terminal, the progress of large transfers is shown there.
     """
 
-    def __init__(self, fp):
+    def __init__(self, fp, name=None):
         self.fp = fp
+        self.progress = None
+        if name and sys.stderr.isatty():
+            self.progress = TransferProgress(name)
 
     def write(self, data):
         if isinstance(data, str):
             data = data.encode()
         self.fp.write(data)
+        if self.progress:
+            self.progress.update(len(data))
 
     def flush(self):
         self.fp.flush()
 
     def close(self):
+        if self.progress:
+            self.progress.finish()
+            self.progress = None
         self.fp.close()
 
     def isatty(self):
@@ -54,3 +196,34 @@ class TextWriter(object):
 
     def fileno(self):
         return self.fp.fileno()
+
+
+class BufferedOutput(object):
+    """Collect output in memory, to be written somewhere else later."""
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        if isinstance(data, str):
+            data = data.encode()
+        self.chunks.append(data)
+
+    def getvalue(self):
+        return b''.join(self.chunks)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+    def isatty(self):
+        # Format the output the same way as for Printer
+        return True
+
+    def fileno(self):
+        return sys.stdout.fileno()
+
+    def clear(self):
+        pass
@@ -0,0 +1,202 @@
+"""The interactive prompt. The cli command only imports this module once it
+starts the prompt, so that --help and --version don't have to load HTTPie,
+prompt_toolkit and Pygments.
+"""
+
+from http.cookies import SimpleCookie
+
+import os
+import sys
+
+import click
+
+from httpie.plugins import FormatterPlugin  # noqa, avoid cyclic import
+from httpie.output.formatters.colors import Solarized256Style
+from prompt_toolkit import prompt
+from prompt_toolkit.auto_suggest import AutoSuggestFromHistory
+from prompt_toolkit.history import FileHistory
+from prompt_toolkit.lexers import PygmentsLexer
+from prompt_toolkit.styles.pygments import style_from_pygments_cls
+from pygments.styles import get_style_by_name
+from pygments.util import ClassNotFound
+
+from . import __version__
+from . import config
+from .completer import HttpPromptCompleter
+from .context import Context
+from .contextio import load_context, ContextSaver
+from .engine import RequestEngine
+from .execution import execute
+from .lexer import HttpPromptLexer
+from .speccache import SpecCache
+from .utils import smart_quote
+from .xdg import get_data_dir
+
+
+def fix_incomplete_url(url):
+    if url.startswith(('s://', '://')):
+        url = 'http' + url
+    elif url.startswith('//'):
+        url = 'http:' + url
+    elif not url.startswith(('http://', 'https://')):
+        url = 'http://' + url
+    return url
+
+
+def update_cookies(base_value, cookies):
+    cookie = SimpleCookie(base_value)
+    for k, v in cookies.items():
+        cookie[k] = v
+    return str(cookie.output(header='', sep=';').lstrip())
+
+
+class ExecutionListener(object):
+
+    def __init__(self, cfg):
+        self.cfg = cfg
+        self.context_saver = ContextSaver(
+            delay=cfg.get('context_save_delay') or 0)
+
+    def context_changed(self, context):
+        # Dump the current context to HTTP Prompt format
+        self.context_saver.save(context)
+
+    def close(self):
+        # Make sure the latest context is saved
+        self.context_saver.close()
+
+    def response_returned(self, context, response):
+        if not response.cookies:
+            return
+
+        cookie_pref = self.cfg.get('set_cookies') or 'auto'
+        if cookie_pref == 'auto' or (
+                cookie_pref == 'ask' and
+                click.confirm('Cookies incoming! Do you want to set them?')):
+            existing_cookie = context.headers.get('Cookie')
+            new_cookie = update_cookies(existing_cookie, response.cookies)
+            context.headers['Cookie'] = new_cookie
+            click.secho('Cookies set: %s' % new_cookie)
+
+
+def get_command_style(name):
+    """Return the Pygments style class named `name`, falling back to
+    Solarized.
+    """
+    try:
+        return get_style_by_name(name)
+    except ClassNotFound:
+        return Solarized256Style
+
+
+def run(spec, env, url, http_options):
+    """Run the prompt with the arguments of the cli command."""
+    click.echo('Version: %s' % __version__)
+
+    copied, config_path = config.initialize()
+    if copied:
+        click.echo('Config file not found. Initialized a new one: %s' %
+                   config_path)
+
+    cfg = config.load()
+    _, cfg_stamp = config.find_user_config()
+
+    # Override pager/less options
+    os.environ['PAGER'] = cfg['pager']
+    os.environ['LESS'] = '-RXF'
+
+    spec_url = spec
+    if spec_url:
+        spec_cache = SpecCache(spec_url)
+        spec = spec_cache.fetch()
+        if spec is None:
+            click.secho("Warning: Specification file '%s' is neither valid JSON nor YAML" %
+                        spec_cache.url, err=True, fg='red')
+        elif spec_cache.fresh:
+            # Only the parsed spec is cached. The endpoint tree is built
+            # lazily from it, and building all of it to be cached would
+            # cost more than it saves.
+            try:
+                spec_cache.save()
+            except OSError as err:
+                click.secho("Warning: Failed to cache specification '%s': %s"
+                            % (spec_cache.url, err), err=True, fg='red')
+
+    if url:
+        url = fix_incomplete_url(url)
+
+    context = Context(url, spec=spec, spec_url=spec_url)
+
+    output_style = cfg.get('output_style')
+    if output_style:
+        context.options['--style'] = output_style
+
+    # For prompt-toolkit
+    history = FileHistory(os.path.join(get_data_dir(), 'history'))
+    lexer = PygmentsLexer(HttpPromptLexer)
+    completer = HttpPromptCompleter(context)
+    style_class = get_command_style(cfg['command_style'])
+    style = style_from_pygments_cls(style_class)
+
+    listener = ExecutionListener(cfg)
+
+    # Keeps connections alive across commands
+    engine = RequestEngine(max_hosts=cfg['connection_pool_hosts'],
+                           max_connections=cfg['connection_pool_maxsize'],
+                           idle_timeout=cfg['connection_idle_timeout'],
+                           timing=cfg['timing'],
+                           timing_history=cfg['timing_history'])
+
+    if len(sys.argv) == 1:
+        # load previous context if nothing defined
+        load_context(context)
+    else:
+        if env:
+            load_context(context, env)
+            if url:
+                # Overwrite the env url if not default
+                context.url = url
+
+        if http_options:
+            # Execute HTTPie options from CLI (can overwrite env file values)
+            http_options = [smart_quote(a) for a in http_options]
+            execute(' '.join(http_options), context, listener=listener,
+                    engine=engine)
+
+    try:
+        while True:
+            # Pick up changes to the config file without a restart. The
+            # connection pool settings only apply to new sessions.
+            _, stamp = config.find_user_config()
+            if stamp != cfg_stamp:
+                cfg_stamp = stamp
+                try:
+                    new_cfg = config.load()
+                except Exception as err:
+                    click.secho('Config not reloaded: %s' % err, err=True,
+                                fg='red')
+                else:
+                    cfg = listener.cfg = new_cfg
+                    os.environ['PAGER'] = cfg['pager']
+                    style_class = get_command_style(cfg['command_style'])
+                    style = style_from_pygments_cls(style_class)
+                    click.echo('Config reloaded.')
+            try:
+                text = prompt('%s> ' % context.url, completer=completer,
+                              lexer=lexer, style=style, history=history,
+                              auto_suggest=AutoSuggestFromHistory(),
+                              vi_mode=cfg['vi'])
+            except KeyboardInterrupt:
+                continue  # Control-C pressed
+            except EOFError:
+                break  # Control-D pressed
+            else:
+                execute(text, context, listener=listener, style=style_class,
+                        engine=engine)
+                if context.should_exit:
+                    break
+    finally:
+        listener.close()
+        engine.close()
+
+    click.echo('Goodbye!')
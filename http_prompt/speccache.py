@@ -0,0 +1,187 @@
+"""On-disk cache of parsed API specs.
+
+Cache entries live in the user data directory, one file per spec URL. An
+entry is reused without downloading or parsing the spec again if the server
+says it hasn't changed (ETag/Last-Modified) or, for file: URLs, if the file
+has the same modification time and size. A re-downloaded spec with the same
+content hash also reuses the parsed spec. Endpoint trees aren't cached, as
+they are built lazily from the spec as they are explored.
+"""
+
+import hashlib
+import json
+import marshal
+import os
+
+from urllib.error import HTTPError
+from urllib.parse import urlparse
+from urllib.request import Request, url2pathname, urlopen
+
+import yaml
+
+from . import __version__
+from . import xdg
+from .utils import write_atomic
+
+
+# Bump this whenever the layout of cache entries changes
+CACHE_VERSION = 1
+
+# Use the much faster libyaml based loader if PyYAML was built with it
+YAMLLoader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+
+def _get_cache_filepath(url):
+    dir_path = xdg.get_data_dir('specs')
+    return os.path.join(dir_path, hashlib.sha1(url.encode()).hexdigest())
+
+
+def _file_validators(url):
+    stat = os.stat(url2pathname(urlparse(url).path))
+    return {'mtime': stat.st_mtime_ns, 'size': stat.st_size}
+
+
+def sniff_format(content, content_type=None, url=None):
+    """Guess if an API spec is 'json' or 'yaml' from its content type, the
+    extension in its URL, or else its first non-blank byte.
+    """
+    if content_type:
+        content_type = content_type.lower()
+        if 'json' in content_type:
+            return 'json'
+        if 'yaml' in content_type:
+            return 'yaml'
+    if url:
+        ext = os.path.splitext(urlparse(url).path)[1].lower()
+        if ext == '.json':
+            return 'json'
+        if ext in ('.yaml', '.yml'):
+            return 'yaml'
+    if content.lstrip()[:1] in (b'{', b'['):
+        return 'json'
+    return 'yaml'
+
+
+def _load_yaml(content):
+    try:
+        return yaml.load(content, Loader=YAMLLoader)
+    except yaml.YAMLError:
+        return None
+
+
+def parse_spec(content, content_type=None, url=None):
+    """Parse an API spec in JSON or YAML from bytes. Return None if it's
+    neither.
+    """
+    if sniff_format(content, content_type=content_type, url=url) == 'yaml':
+        return _load_yaml(content)
+    try:
+        return json.loads(content)
+    except ValueError:
+        # Mislabeled, or YAML that happens to start with a brace
+        return _load_yaml(content)
+
+
+class SpecCache(object):
+    """Fetch an API spec from a URL through the cache.
+
+    After fetch(), `fresh` tells if the spec was parsed anew and has yet to
+    be saved.
+    """
+
+    def __init__(self, url):
+        self.url = url
+        self.fresh = False
+        self._file_path = _get_cache_filepath(url)
+        self._entry = None
+
+    def _read_entry(self):
+        try:
+            with open(self._file_path, 'rb') as f:
+                entry = marshal.load(f)
+        except (OSError, EOFError, ValueError, TypeError):
+            return None
+        if (not isinstance(entry, dict) or
+                entry.get('version') != (CACHE_VERSION, __version__) or
+                entry.get('url') != self.url):
+            return None
+        return entry
+
+    def _use_entry(self, entry):
+        self._entry = entry
+        return entry['spec']
+
+    def _download(self, cached):
+        """Return a tuple (content, content_type, validators). `content` is
+        None if the cached entry is still valid.
+        """
+        if self.url.startswith('file:'):
+            try:
+                validators = _file_validators(self.url)
+            except OSError:
+                # Let urlopen() report the error
+                validators = None
+            if validators and cached and cached['validators'] == validators:
+                return None, None, validators
+            with urlopen(self.url) as f:
+                return f.read(), None, validators
+
+        request = Request(self.url)
+        if cached:
+            etag = cached['validators'].get('etag')
+            last_modified = cached['validators'].get('last_modified')
+            if etag:
+                request.add_header('If-None-Match', etag)
+            if last_modified:
+                request.add_header('If-Modified-Since', last_modified)
+        try:
+            f = urlopen(request)
+        except HTTPError as err:
+            if err.code == 304 and cached:
+                return None, None, cached['validators']
+            raise
+        with f:
+            validators = {
+                'etag': f.headers.get('ETag'),
+                'last_modified': f.headers.get('Last-Modified')
+            }
+            return f.read(), f.headers.get('Content-Type'), validators
+
+    def fetch(self):
+        """Return the parsed spec, or None if it's neither JSON nor YAML."""
+        cached = self._read_entry()
+        content, content_type, validators = self._download(cached)
+        if content is None:
+            return self._use_entry(cached)
+
+        digest = hashlib.sha1(content).hexdigest()
+        if cached and cached['digest'] == digest:
+            cached['validators'] = validators
+            self._write_entry(cached)
+            return self._use_entry(cached)
+
+        spec = parse_spec(content, content_type=content_type, url=self.url)
+        self.fresh = True
+        self._entry = {
+            'url': self.url,
+            'validators': validators,
+            'digest': digest,
+            'spec': spec
+        }
+        return spec
+
+    def _write_entry(self, entry):
+        entry = dict(entry, version=(CACHE_VERSION, __version__))
+        try:
+            data = marshal.dumps(entry)
+        except ValueError:
+            # Some YAML specs contain values marshal can't handle, such as
+            # dates. Such specs are simply not cached.
+            return
+        write_atomic(self._file_path, data)
+
+    def save(self):
+        """Save the fetched spec."""
+        if self._entry and self._entry['spec'] is not None:
+            self._write_entry(self._entry)
+            self.fresh = False
@@ -0,0 +1,185 @@
+"""Timing of the phases of HTTP requests.
+
+The connection pools of the request engine use the connection classes
+below. While timings are being recorded in the current thread, they measure
+how long each request spends resolving the host name, connecting, doing the
+TLS handshake and waiting for the response. Otherwise they behave exactly
+like the urllib3 classes they extend.
+"""
+
+import socket
+import threading
+
+from contextlib import contextmanager
+from time import monotonic
+
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import (HTTPConnectionPool, HTTPSConnectionPool,
+                                    port_by_scheme)
+from urllib3.exceptions import NewConnectionError
+from urllib3.util.connection import allowed_gai_family
+
+
+_local = threading.local()
+
+
+def _format_duration(seconds):
+    if seconds is None:
+        return '-'
+    return '%.1fms' % (seconds * 1000)
+
+
+class Timing(object):
+    """Durations of the phases of a request, in seconds. A phase is None if
+    it didn't happen, e.g. connecting if a kept-alive connection was reused.
+    """
+
+    PHASES = ('dns', 'connect', 'tls', 'ttfb', 'total')
+
+    def __init__(self, method, url):
+        self.method = method
+        self.url = url
+        self.status = None
+        self.start = monotonic()
+
+        self.dns = None
+        self.connect = None
+        self.tls = None
+        # Time to first byte and total time, both since the request started
+        self.ttfb = None
+        self.total = None
+
+    def format(self):
+        """Format the timing as a single line of text."""
+        status = self.status if self.status is not None else '-'
+        return '%s %s %s  DNS %s  Connect %s  TLS %s  TTFB %s  Total %s' % (
+            self.method, self.url, status,
+            *(_format_duration(getattr(self, phase))
+              for phase in self.PHASES))
+
+
+@contextmanager
+def record(timings):
+    """Append a Timing to the list `timings` for every request made by the
+    current thread in the with-block. Nothing is recorded if `timings` is
+    None.
+    """
+    prev_timings = getattr(_local, 'timings', None)
+    _local.timings = timings
+    try:
+        yield timings
+    finally:
+        _local.timings = prev_timings
+        if timings:
+            # A request is over when the next one starts, and the last one
+            # when its response body has been handled
+            end = monotonic()
+            for timing, next_timing in zip(timings, timings[1:] + [None]):
+                if timing.total is None:
+                    if next_timing:
+                        timing.total = next_timing.start - timing.start
+                    else:
+                        timing.total = end - timing.start
+
+
+class _TimedConnectionMixin(object):
+
+    # The Timing of the request being made on the connection, if any
+    timing = None
+
+    def _new_conn(self):
+        timing = self.timing
+        if timing is None:
+            return super(_TimedConnectionMixin, self)._new_conn()
+
+        # Resolve the host name separately to time it, then connect to the
+        # addresses it resolved to in turn
+        start = monotonic()
+        try:
+            addresses = socket.getaddrinfo(self._dns_host, self.port,
+                                           allowed_gai_family(),
+                                           socket.SOCK_STREAM)
+        except (socket.gaierror, UnicodeError):
+            addresses = None
+        if not addresses:
+            # Let urllib3 report the error
+            return super(_TimedConnectionMixin, self)._new_conn()
+        timing.dns = monotonic() - start
+
+        start = monotonic()
+        dns_host = self._dns_host
+        try:
+            for i, address in enumerate(addresses):
+                self._dns_host = address[4][0]
+                try:
+                    sock = super(_TimedConnectionMixin, self)._new_conn()
+                    break
+                except NewConnectionError:
+                    if i == len(addresses) - 1:
+                        raise
+        finally:
+            self._dns_host = dns_host
+        timing.connect = monotonic() - start
+        return sock
+
+
+class TimedHTTPConnection(_TimedConnectionMixin, HTTPConnection):
+    pass
+
+
+class TimedHTTPSConnection(_TimedConnectionMixin, HTTPSConnection):
+
+    def connect(self):
+        timing = self.timing
+        start = monotonic()
+        super(TimedHTTPSConnection, self).connect()
+        if timing is not None and timing.connect is not None:
+            timing.tls = (monotonic() - start - (timing.dns or 0) -
+                          timing.connect)
+
+
+class _TimedPoolMixin(object):
+
+    def _make_request(self, conn, method, url, *args, **kwargs):
+        timings = getattr(_local, 'timings', None)
+        if timings is None or not isinstance(conn, _TimedConnectionMixin):
+            return super(_TimedPoolMixin, self)._make_request(
+                conn, method, url, *args, **kwargs)
+
+        netloc = self.host
+        if self.port and self.port != port_by_scheme.get(self.scheme):
+            netloc += ':%d' % self.port
+        timing = Timing(method, '%s://%s%s' % (self.scheme, netloc, url))
+        timings.append(timing)
+
+        conn.timing = timing
+        try:
+            response = super(_TimedPoolMixin, self)._make_request(
+                conn, method, url, *args, **kwargs)
+        finally:
+            conn.timing = None
+        timing.ttfb = monotonic() - timing.start
+        timing.status = response.status
+        return response
+
+
+class TimedHTTPConnectionPool(_TimedPoolMixin, HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+
+class TimedHTTPSConnectionPool(_TimedPoolMixin, HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+
+POOL_CLASSES = {
+    'http': TimedHTTPConnectionPool,
+    'https': TimedHTTPSConnectionPool
+}
+
+
+def use_timed_pools(adapters):
+    """Make the given transport adapters create timed connection pools."""
+    for adapter in adapters:
+        if isinstance(adapter, HTTPAdapter):
+            adapter.poolmanager.pool_classes_by_scheme = POOL_CLASSES
@@ -3,6 +3,9 @@
 
 class Node(object):
 
+    __slots__ = ('name', 'data', 'parent', 'loader', 'sort_key', '_children',
+                 '_wildcard', '_listing')
+
     def __init__(self, name, data=None, parent=None):
         if name in ('.', '..'):
             raise ValueError("name cannot be '.' or '..'")
@@ -10,7 +13,18 @@ class Node(object):
         self.name = name
         self.data = data or {}
         self.parent = parent
-        self.children = set()
+        self.loader = None
+
+        # Same order as __lt__, without looking up the type every time
+        self.sort_key = (self.data.get('type') or '', name)
+
+        # Name => child, and the first child that is a wildcard like
+        # {user_id}, if any
+        self._children = {}
+        self._wildcard = None
+
+        # Sorted list of the children, built on demand by listing()
+        self._listing = None
 
     def __str__(self):
         return self.name
@@ -19,11 +33,7 @@ class Node(object):
         return "Node('{}', '{}')".format(self.name, self.data.get('type'))
 
     def __lt__(self, other):
-        ta = self.data.get('type')
-        tb = other.data.get('type')
-        if ta != tb:
-            return ta < tb
-        return self.name < other.name
+        return self.sort_key < other.sort_key
 
     def __eq__(self, other):
         return self.name == other.name and self.data == other.data
@@ -31,6 +41,34 @@ class Node(object):
     def __hash__(self):
         return hash((self.name, self.data.get('type')))
 
+    @property
+    def children(self):
+        if self.loader:
+            self.load()
+        return self._children.values()
+
+    def add_child(self, child):
+        """Add a child node, replacing any child with the same name."""
+        if self.loader:
+            self.load()
+        self._children[child.name] = child
+        self._listing = None
+        if (self._wildcard is None and child.name.startswith('{') and
+                child.name.endswith('}')):
+            self._wildcard = child
+
+    def load(self):
+        """Populate the children with the loader, if it hasn't run yet.
+
+        A loader is a callable that takes the node and adds its children,
+        which may in turn be given loaders of their own. This way a tree can
+        be built one level at a time as it is explored.
+        """
+        loader = self.loader
+        if loader:
+            self.loader = None
+            loader(self)
+
     def add_path(self, *path, **kwargs):
         node_type = kwargs.get('node_type', 'dir')
         name = path[0]
@@ -39,21 +77,32 @@ class Node(object):
         if not child:
             data = {'type': 'dir' if tail else node_type}
             child = Node(name, data=data, parent=self)
-            self.children.add(child)
+            self.add_child(child)
 
         if tail:
             child.add_path(*tail, node_type=node_type)
 
+    def listing(self):
+        """Return the children sorted by type and then name. The list is
+        cached until a child is added, so it must not be modified.
+        """
+        if self.loader:
+            self.load()
+        if self._listing is None:
+            self._listing = sorted(self._children.values(),
+                                   key=lambda node: node.sort_key)
+        return self._listing
+
     def find_child(self, name, wildcard=True):
-        for child in self.children:
-            if child.name == name:
-                return child
+        if self.loader:
+            self.load()
+        child = self._children.get(name)
+        if child:
+            return child
 
         # Attempt to match wildcard like /users/{user_id}
         if wildcard:
-            for child in self.children:
-                if child.name.startswith('{') and child.name.endswith('}'):
-                    return child
+            return self._wildcard
 
         return None
 
@@ -74,5 +123,5 @@ class Node(object):
                     success = False
                     break
         if success:
-            for node in sorted(cur.children):
+            for node in cur.listing():
                 yield node
@@ -1,6 +1,8 @@
 import math
+import os
 import re
 import shlex
+import tempfile
 
 from prompt_toolkit.output.defaults import create_output
 
@@ -31,6 +33,37 @@ def unescape(s, exclude=None):
     return re.sub(r'\\(%s)' % char, r'\1', s)
 
 
+# The umask can only be read by setting it, which isn't thread-safe, so
+# it's read once at import time
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+def write_atomic(file_path, data):
+    """Write bytes to a temporary file and rename it over `file_path`, so a
+    crash never leaves a truncated file behind. The file keeps its mode, or
+    gets the default mode for new files if it doesn't exist yet.
+    """
+    try:
+        mode = os.stat(file_path).st_mode & 0o7777
+    except OSError:
+        mode = 0o666 & ~_UMASK
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(file_path),
+                                     prefix=os.path.basename(file_path),
+                                     suffix='.tmp')
+    try:
+        with open(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        # mkstemp() creates files only readable by the user
+        os.chmod(temp_path, mode)
+        os.replace(temp_path, file_path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+
 def get_terminal_size():
     return create_output().get_size()
 
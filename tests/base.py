@@ -1,9 +1,14 @@
+import json
 import os
 import shutil
 import sys
 import tempfile
+import threading
 import unittest
 
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+
 
 class TempAppDirTestCase(unittest.TestCase):
     """Set up temporary app data and config directories before every test
@@ -57,3 +62,50 @@ class TempAppDirTestCase(unittest.TestCase):
         with tempfile.NamedTemporaryFile(dir=full_tempdir, delete=False) as f:
             f.write(data)
             return f.name
+
+
+class ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+
+    daemon_threads = True
+
+
+class HTTPServerTestCase(TempAppDirTestCase):
+    """Serve HTTP requests from a local server in a background thread during
+    every test method.
+    """
+
+    class RequestHandler(BaseHTTPRequestHandler):
+
+        protocol_version = 'HTTP/1.1'
+
+        def setup(self):
+            BaseHTTPRequestHandler.setup(self)
+            self.server.num_connections += 1
+
+        def do_GET(self):
+            body = json.dumps({'path': self.path}).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.send_header('Set-Cookie', 'sessionid=abcd')
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    def setUp(self):
+        super(HTTPServerTestCase, self).setUp()
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0),
+                                          self.RequestHandler)
+        self.server.num_connections = 0
+        self.server_thread = threading.Thread(target=self.server.serve_forever)
+        self.server_thread.daemon = True
+        self.server_thread.start()
+        self.server_url = 'http://127.0.0.1:%d' % self.server.server_port
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.server_thread.join()
+        super(HTTPServerTestCase, self).tearDown()
@@ -1,4 +1,5 @@
-from http_prompt.context import Context
+from http_prompt.context import Context, ContextView
+from http_prompt.context.transform import extract_args_for_httpie_main
 
 
 def test_creation():
@@ -64,6 +65,32 @@ def test_update():
     }
 
 
+def test_view():
+    base = Context('http://localhost')
+    base.headers.update({'Accept': 'text/html', 'X-Foo': 'a'})
+    base.querystring_params['page'] = ['1']
+    base.options['--verify'] = 'no'
+
+    override = Context('http://localhost/users')
+    override.headers['Accept'] = 'application/json'
+    override.querystring_params['page'] = ['2', '3']
+    override.body_params['name'] = 'alice'
+
+    view = ContextView(base, override)
+    expected = base.copy()
+    expected.update(override)
+    assert view == expected
+    assert view.copy() == expected
+    assert view.copy().headers is not base.headers
+    assert (extract_args_for_httpie_main(view, 'get') ==
+            extract_args_for_httpie_main(expected, 'get'))
+
+    # The view follows changes to the contexts it's made of
+    base.headers['X-Bar'] = 'b'
+    assert view.headers['X-Bar'] == 'b'
+    assert 'X-Bar' not in expected.headers
+
+
 def test_spec():
     c = Context('http://localhost', spec={
         'paths': {
@@ -159,3 +186,26 @@ def test_override():
     assert next(filter(lambda i:i.name == 'custom1', users_methods), None) is not None
     assert next(filter(lambda i:i.name == 'custom2', users_methods), None) is not None
     assert next(filter(lambda i:i.name == 'Accept', users_methods), None) is not None
+
+
+def test_spec_lazy():
+    """The tree is built as it is explored
+    """
+    c = Context('http://localhost', spec={
+        'paths': {
+            '/users/{username}': {
+                'get': {
+                    'parameters': [{'name': 'since', 'in': 'query'}]
+                }
+            },
+            '/orgs': {
+                # Not resolved unless looked at
+                'get': {'parameters': [{'$ref': '#/missing/param'}]}
+            }
+        }
+    })
+    assert c.root.loader is not None
+
+    assert [n.name for n in c.root.ls('users', 'bob')] == ['since']
+    assert c.root.loader is None
+    assert c.root.find_child('orgs').loader is not None
@@ -0,0 +1,84 @@
+import pytest
+
+from http_prompt.context import Context
+from http_prompt.context.resolver import RefResolutionError, RefResolver
+
+
+def test_resolve_swagger2():
+    spec = {'parameters': {'page': {'name': 'page', 'in': 'query'}}}
+    resolver = RefResolver(spec)
+    assert resolver.resolve({'$ref': '#/parameters/page'}) == {
+        'name': 'page', 'in': 'query'}
+
+
+def test_resolve_openapi3():
+    spec = {'components': {'parameters': {
+        'a/b~c': {'name': 'x', 'in': 'header'}}}}
+    resolver = RefResolver(spec)
+    assert resolver.resolve(
+        {'$ref': '#/components/parameters/a~1b~0c'}
+    ) == {'name': 'x', 'in': 'header'}
+
+
+def test_resolve_not_a_ref():
+    resolver = RefResolver({})
+    param = {'name': 'page'}
+    assert resolver.resolve(param) is param
+
+
+def test_resolve_chain_cached():
+    spec = {
+        'parameters': {
+            'a': {'$ref': '#/parameters/b'},
+            'b': {'name': 'page', 'in': 'query'}
+        }
+    }
+    resolver = RefResolver(spec)
+    assert resolver.resolve({'$ref': '#/parameters/a'})['name'] == 'page'
+
+    # Served from the cache from now on
+    spec['parameters'].clear()
+    assert resolver.resolve({'$ref': '#/parameters/a'})['name'] == 'page'
+    assert resolver.resolve({'$ref': '#/parameters/b'})['name'] == 'page'
+
+
+def test_resolve_errors():
+    spec = {
+        'parameters': {
+            'a': {'$ref': '#/parameters/b'},
+            'b': {'$ref': '#/parameters/a'}
+        }
+    }
+    resolver = RefResolver(spec)
+    with pytest.raises(RefResolutionError):
+        resolver.resolve({'$ref': '#/parameters/a'})
+    with pytest.raises(RefResolutionError):
+        resolver.resolve({'$ref': '#/parameters/missing'})
+    with pytest.raises(RefResolutionError):
+        resolver.resolve({'$ref': 'other.yaml#/parameters/a'})
+
+
+def test_context_refs():
+    c = Context('http://localhost', spec={
+        'paths': {
+            '/users': {
+                'parameters': [{'$ref': '#/components/parameters/page'}],
+                'get': {
+                    'parameters': [
+                        {'$ref': '#/components/parameters/accept'},
+                        {'$ref': '#/components/parameters/missing'},
+                        {'$ref': '#/components/parameters/loop'}
+                    ]
+                }
+            }
+        },
+        'components': {
+            'parameters': {
+                'page': {'name': 'page', 'in': 'query'},
+                'accept': {'$ref': '#/components/parameters/accept2'},
+                'accept2': {'name': 'Accept', 'in': 'header'},
+                'loop': {'$ref': '#/components/parameters/loop'}
+            }
+        }
+    })
+    assert [n.name for n in c.root.ls('users')] == ['Accept', 'page']
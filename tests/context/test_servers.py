@@ -0,0 +1,124 @@
+from unittest.mock import Mock
+
+from http_prompt.context import Context
+from http_prompt.context.resolver import RefResolver
+from http_prompt.context.servers import ServerIndex, server_url
+
+
+def test_server_url():
+    assert server_url({'url': 'https://example.com/v1/'}) == \
+        'https://example.com/v1'
+    assert server_url({
+        'url': '{scheme}://{host}/api/{version}',
+        'variables': {
+            'scheme': {'default': 'https'},
+            'host': {'default': 'example.com'}
+        }
+    }) == 'https://example.com/api/{version}'
+    assert server_url({'url': '/api'}) == 'http://localhost:8000/api'
+
+
+def test_server_url_relative_to_spec():
+    spec_url = 'https://petstore3.swagger.io/api/v3/openapi.json'
+    assert server_url({'url': '/api/v3'}, spec_url) == \
+        'https://petstore3.swagger.io/api/v3'
+    assert server_url({'url': 'v2'}, spec_url) == \
+        'https://petstore3.swagger.io/api/v3/v2'
+    assert server_url({'url': 'https://example.com/'}, spec_url) == \
+        'https://example.com'
+
+    # Specs read from files have no server to be relative to
+    assert server_url({'url': '/api'}, 'file:///tmp/spec.json') == \
+        'http://localhost:8000/api'
+
+
+def test_index_resolve():
+    index = ServerIndex('https://api.example.com/v1')
+    index.add('/files', 'https://files.example.com')
+    index.add('/files/{id}/raw/', 'https://raw.example.com/base')
+
+    assert index.resolve('https://api.example.com/v1/users') == \
+        'https://api.example.com/v1/users'
+    assert index.resolve('https://api.example.com/v1/files/') == \
+        'https://files.example.com/files/'
+    assert index.resolve('https://api.example.com/v1/files/1?x=1') == \
+        'https://files.example.com/files/1?x=1'
+    assert index.resolve('https://api.example.com/v1/files/1/raw/a') == \
+        'https://raw.example.com/base/files/1/raw/a'
+
+    # Only URLs on the default server are moved
+    assert index.resolve('https://example.com/v1/files') == \
+        'https://example.com/v1/files'
+    assert index.resolve('https://api.example.com/files') == \
+        'https://api.example.com/files'
+
+
+def test_index_to_default():
+    index = ServerIndex('https://api.example.com/v1')
+    index.add('/files/{id}/content', 'https://files.example.com')
+    index.add('/files/{id}/raw/', 'https://raw.example.com/base')
+
+    assert index.to_default('https://files.example.com/files/1/content') == \
+        'https://api.example.com/v1/files/1/content'
+    assert index.to_default('https://raw.example.com/base/files/1/raw/a/') \
+        == 'https://api.example.com/v1/files/1/raw/a/'
+    for url in ['https://api.example.com/v1/files/1/content',
+                'https://raw.example.com/files/1/raw',
+                'https://files.example.com/files/1',
+                'https://files.example.com/files/1/raw']:
+        assert index.to_default(url) == url
+
+
+def test_index_from_spec_resolves_only_refs():
+    spec = {
+        'paths': {
+            '/users': {'get': {}},
+            '/files': {'$ref': '#/x-files'}
+        },
+        'x-files': {'servers': [{'url': 'https://files.example.com'}]}
+    }
+    resolver = Mock(wraps=RefResolver(spec))
+    index = ServerIndex.from_spec(spec, resolver, 'https://api.example.com')
+    resolver.resolve.assert_called_once_with({'$ref': '#/x-files'})
+    assert index.resolve('https://api.example.com/files/1') == \
+        'https://files.example.com/files/1'
+
+
+def test_context_servers():
+    c = Context(spec={
+        'servers': [
+            {'url': 'https://api.example.com/{version}',
+             'variables': {'version': {'default': 'v2'}}},
+            {'url': 'https://staging.example.com/v2'}
+        ],
+        'paths': {
+            '/users': {
+                'get': {'parameters': [{'name': 'page', 'in': 'query'}]}
+            }
+        }
+    })
+    assert c.url == 'https://api.example.com/v2'
+    assert not c.servers
+    assert [n.name for n in c.root.ls()] == ['v2']
+    assert [n.name for n in c.root.ls('v2', 'users')] == ['page']
+
+    # A given URL takes precedence
+    c = Context('http://localhost', spec={
+        'servers': [{'url': 'https://api.example.com'}],
+        'paths': {'/users': {}}
+    })
+    assert c.url == 'http://localhost'
+
+
+def test_context_relative_servers():
+    spec_url = 'https://petstore3.swagger.io/api/v3/openapi.json'
+    c = Context(spec={
+        'servers': [{'url': '/api/v3'}],
+        'paths': {
+            '/pet': {},
+            '/files': {'servers': [{'url': '/files-api'}]}
+        }
+    }, spec_url=spec_url)
+    assert c.url == 'https://petstore3.swagger.io/api/v3'
+    assert c.servers.resolve(c.url + '/files') == \
+        'https://petstore3.swagger.io/files-api/files'
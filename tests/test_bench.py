@@ -0,0 +1,84 @@
+import unittest
+
+from unittest.mock import patch
+
+from .base import HTTPServerTestCase
+from http_prompt.bench import BenchResult, Benchmark, percentile
+from http_prompt.context import Context
+from http_prompt.execution import execute
+
+
+class TestPercentile(unittest.TestCase):
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile(values, 100), 100)
+        self.assertEqual(percentile([5], 90), 5)
+        self.assertIsNone(percentile([], 50))
+
+
+class TestBenchResult(unittest.TestCase):
+
+    def test_format(self):
+        result = BenchResult()
+        result.add(0.010, 200)
+        result.add(0.030, 200)
+        result.add(0.020, 'ConnectionError')
+        result.elapsed = 0.5
+        text = result.format()
+        self.assertIn('Requests:    3\n', text)
+        self.assertIn('Throughput:  6.0 requests/s', text)
+        self.assertIn('min 10.0ms, mean 20.0ms, max 30.0ms', text)
+        self.assertIn('p50 20.0ms', text)
+        self.assertIn('  200        2\n', text)
+        self.assertIn('  ConnectionError 1\n', text)
+
+
+class TestBenchmark(HTTPServerTestCase):
+
+    def test_run(self):
+        benchmark = Benchmark(['GET', self.server_url + '/users'],
+                              num_requests=20, concurrency=4)
+        result = benchmark.run()
+        self.assertEqual(len(result.latencies), 20)
+        self.assertEqual(result.outcomes, {200: 20})
+        self.assertFalse(result.interrupted)
+        self.assertLessEqual(self.server.num_connections, 4)
+
+    def test_httpie_2_signature(self):
+        calls = []
+
+        def collect_messages(args, config_dir,
+                             request_body_read_callback=None):
+            calls.append((args, config_dir))
+            return iter([])
+
+        benchmark = Benchmark(['GET', self.server_url + '/users'],
+                              num_requests=1)
+        with patch('http_prompt.bench.collect_messages', collect_messages), \
+                patch('http_prompt.bench._COLLECT_MESSAGES_TAKES_ENV', False):
+            result = benchmark.run()
+        self.assertEqual(result.outcomes, {None: 1})
+        self.assertEqual(calls, [(benchmark._args,
+                                  benchmark._env.config.directory)])
+
+    def test_connection_error(self):
+        benchmark = Benchmark(['GET', 'http://localhost:1/'], num_requests=2)
+        result = benchmark.run()
+        self.assertEqual(result.outcomes, {'ConnectionError': 2})
+
+    @patch('http_prompt.output.click.echo_via_pager')
+    def test_command(self, echo_via_pager):
+        context = Context(self.server_url)
+        context.headers['Accept'] = 'application/json'
+        execute('bench get -n 5 -c 2 /users X-Foo:bar', context)
+
+        text = echo_via_pager.call_args[0][0]
+        self.assertIn('Requests:    5\n', text)
+        self.assertIn('  200        5', text)
+        self.assertLessEqual(self.server.num_connections, 2)
+        # The overrides only applied to the benchmark
+        self.assertEqual(context.url, self.server_url)
+        self.assertEqual(context.headers, {'Accept': 'application/json'})
@@ -1,5 +1,6 @@
 import json
 import os
+import subprocess
 import sys
 import unittest
 from unittest.mock import patch, DEFAULT
@@ -10,7 +11,8 @@ from requests.models import Response
 from .base import TempAppDirTestCase
 from http_prompt import xdg
 from http_prompt.context import Context
-from http_prompt.cli import cli, execute, ExecutionListener
+from http_prompt.cli import cli
+from http_prompt.repl import execute, ExecutionListener
 
 
 def run_and_exit(cli_args=None, prompt_commands=None):
@@ -30,7 +32,7 @@ def run_and_exit(cli_args=None, prompt_commands=None):
     sys.argv = ['http-prompt'] + cli_args
 
     try:
-        with patch.multiple('http_prompt.cli',
+        with patch.multiple('http_prompt.repl',
                             prompt=DEFAULT, execute=DEFAULT) as mocks:
             mocks['execute'].side_effect = execute
 
@@ -140,6 +142,24 @@ class TestCli(TempAppDirTestCase):
         self.assertEqual(result.exit_code, 0)
         self.assertTrue(os.path.exists(config_path))
 
+    @patch('http_prompt.repl.prompt')
+    def test_config_reloaded(self, prompt_mock):
+        config_path = os.path.join(xdg.get_config_dir(), 'config.py')
+
+        def prompt(*args, **kwargs):
+            if prompt_mock.call_count == 1:
+                with open(config_path, 'a') as f:
+                    f.write('\nvi = True\n')
+                return ''
+            raise EOFError
+
+        prompt_mock.side_effect = prompt
+        result = CliRunner().invoke(cli, [])
+        self.assertEqual(result.exit_code, 0)
+        self.assertIn('Config reloaded.', result.output)
+        self.assertFalse(prompt_mock.call_args_list[0][1]['vi_mode'])
+        self.assertTrue(prompt_mock.call_args_list[1][1]['vi_mode'])
+
     def test_cli_arguments_with_spaces(self):
         result, context = run_and_exit(['example.com', "name=John Doe",
                                         "Authorization:Bearer API KEY"])
@@ -164,6 +184,46 @@ class TestCli(TempAppDirTestCase):
         self.assertEqual(set([n.name for n in context.root.children]),
                          set(['users', 'orgs']))
 
+    def test_spec_reused(self):
+        spec = {'paths': {'/users': {}, '/orgs': {}}}
+        spec_filepath = self.make_tempfile(json.dumps(spec))
+        result, context = run_and_exit(['example.com', "--spec",
+                                        spec_filepath])
+        self.assertEqual(result.exit_code, 0)
+        # The tree isn't built to be cached
+        self.assertIsNotNone(context.root.loader)
+
+        with patch('http_prompt.speccache.parse_spec') as parse_mock:
+            result, context = run_and_exit(['example.com', "--spec",
+                                            spec_filepath])
+        self.assertEqual(result.exit_code, 0)
+        self.assertFalse(parse_mock.called)
+        self.assertEqual(set([n.name for n in context.root.children]),
+                         set(['users', 'orgs']))
+
+        # A changed spec invalidates the saved one
+        spec['paths']['/repos'] = {}
+        with open(spec_filepath, 'w') as f:
+            json.dump(spec, f)
+        result, context = run_and_exit(['example.com', "--spec",
+                                        spec_filepath])
+        self.assertEqual(set([n.name for n in context.root.children]),
+                         set(['users', 'orgs', 'repos']))
+
+    def test_spec_cache_write_error(self):
+        spec_filepath = self.make_tempfile(json.dumps({
+            'paths': {'/users': {}}
+        }))
+        with patch('http_prompt.speccache.write_atomic',
+                   side_effect=OSError('disk full')):
+            result, context = run_and_exit(['example.com', "--spec",
+                                            spec_filepath])
+        self.assertEqual(result.exit_code, 0)
+        self.assertIn('disk full', result.output)
+        self.assertIn('Goodbye!', result.output)
+        self.assertEqual(set([n.name for n in context.root.children]),
+                         set(['users']))
+
     def test_spec_basePath(self):
         spec_filepath = self.make_tempfile(json.dumps({
             'basePath': '/api/v1',
@@ -261,8 +321,8 @@ class TestCli(TempAppDirTestCase):
         self.assertEqual(context.headers, {})
         self.assertEqual(context.querystring_params, {'id': ['10']})
 
-    @patch('http_prompt.cli.prompt')
-    @patch('http_prompt.cli.execute')
+    @patch('http_prompt.repl.prompt')
+    @patch('http_prompt.repl.execute')
     def test_press_ctrl_d(self, execute_mock, prompt_mock):
         prompt_mock.side_effect = EOFError
         execute_mock.side_effect = execute
@@ -291,7 +351,7 @@ class TestExecutionListenerSetCookies(unittest.TestCase):
         self.assertEqual(self.context.headers['Cookie'],
                          'name="John Doe"; sessionid=abcd; username=john')
 
-    @patch('http_prompt.cli.click.confirm')
+    @patch('http_prompt.repl.click.confirm')
     def test_ask_and_yes(self, confirm_mock):
         confirm_mock.return_value = True
 
@@ -301,7 +361,7 @@ class TestExecutionListenerSetCookies(unittest.TestCase):
         self.assertEqual(self.context.headers['Cookie'],
                          'name="John Doe"; sessionid=abcd; username=john')
 
-    @patch('http_prompt.cli.click.confirm')
+    @patch('http_prompt.repl.click.confirm')
     def test_ask_and_no(self, confirm_mock):
         confirm_mock.return_value = False
 
@@ -317,3 +377,43 @@ class TestExecutionListenerSetCookies(unittest.TestCase):
 
         self.assertEqual(self.context.headers['Cookie'],
                          'name="John Doe"; sessionid=xyz')
+
+
+def import_times(code):
+    """Run Python code in a new interpreter with -X importtime and return a
+    dict of the cumulative import time of every module, in microseconds.
+    """
+    p = subprocess.run([sys.executable, '-X', 'importtime', '-c', code],
+                       stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                       universal_newlines=True, check=True)
+    times = {}
+    for line in p.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        parts = line.split('|')
+        if line.startswith('import time:') and parts[1].strip().isdigit():
+            times[parts[2].strip()] = int(parts[1])
+    return times
+
+
+class TestStartup(unittest.TestCase):
+
+    HEAVY_MODULES = ('httpie', 'parsimonious', 'prompt_toolkit', 'pygments',
+                     'yaml', 'requests')
+
+    def assert_not_imported(self, times):
+        heavy = [name for name in times
+                 if name.split('.')[0] in self.HEAVY_MODULES]
+        self.assertEqual(heavy, [])
+
+    def test_version(self):
+        self.assert_not_imported(import_times(
+            "import sys; sys.argv = ['http-prompt', '--version']; "
+            "from http_prompt.cli import cli; cli()"))
+
+    def test_help(self):
+        self.assert_not_imported(import_times(
+            "import sys; sys.argv = ['http-prompt', '--help']; "
+            "from http_prompt.cli import cli; cli()"))
+
+    def test_import(self):
+        self.assert_not_imported(import_times('import http_prompt.cli'))
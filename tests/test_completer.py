@@ -128,3 +128,18 @@ class TestCompleter(unittest.TestCase):
         self.context.url = 'http://localhost/orgs'
         result = self.get_completions('cd 1/')
         self.assertEqual(result, ['events', 'members'])
+
+    def test_path_server(self):
+        self.context = Context(spec={
+            'servers': [{'url': 'https://api.example.com/v1'}],
+            'paths': {
+                '/files/{id}/content': {
+                    'servers': [{'url': 'https://files.example.com'}]
+                },
+                '/files/{id}/content/versions': {}
+            }
+        })
+        self.completer = HttpPromptCompleter(self.context)
+        self.context.url = 'https://files.example.com/files/1/content'
+        result = self.get_completions('cd ')
+        self.assertEqual(result, ['versions'])
@@ -1,8 +1,12 @@
 import hashlib
 import os
+import unittest
+
+from unittest.mock import patch
 
 from .base import TempAppDirTestCase
 from http_prompt import config
+from http_prompt import xdg
 
 
 def _hash_file(path):
@@ -68,3 +72,54 @@ class TestConfig(TempAppDirTestCase):
         self.assertFalse(cfg['output_style'])
         self.assertEqual(cfg['pager'], 'more')
         self.assertEqual(cfg['greeting'], 'hello!')
+
+    def test_load_user_cached_bytecode(self):
+        copied, path = config.initialize()
+        with open(path, 'w') as f:
+            f.write("greeting = 'hello!'\n")
+        self.assertEqual(config.load_user(), {'greeting': 'hello!'})
+
+        with patch('http_prompt.config.compile', create=True) as compile_mock:
+            self.assertEqual(config.load_user(), {'greeting': 'hello!'})
+        self.assertFalse(compile_mock.called)
+
+        # A changed file is compiled again
+        with open(path, 'w') as f:
+            f.write("greeting = 'bonjour!'\n")
+        self.assertEqual(config.load_user(), {'greeting': 'bonjour!'})
+
+    def test_load_user_json(self):
+        path = os.path.join(xdg.get_config_dir(), 'config.json')
+        with open(path, 'w') as f:
+            f.write('{"pager": "more", "vi": true}')
+
+        copied, actual_path = config.initialize()
+        self.assertFalse(copied)
+        self.assertEqual(actual_path, path)
+        self.assertFalse(os.path.exists(config.get_user_config_path()))
+
+        cfg = config.load()
+        self.assertEqual(cfg['pager'], 'more')
+        self.assertTrue(cfg['vi'])
+        self.assertEqual(cfg['command_style'], 'solarized')
+
+    @unittest.skipIf(config.tomllib is None, 'No TOML parser')
+    def test_load_user_toml(self):
+        path = os.path.join(xdg.get_config_dir(), 'config.toml')
+        with open(path, 'w') as f:
+            f.write("pager = 'more'\nconnection_idle_timeout = 30\n")
+
+        cfg = config.load()
+        self.assertEqual(cfg['pager'], 'more')
+        self.assertEqual(cfg['connection_idle_timeout'], 30)
+
+    def test_find_user_config(self):
+        self.assertEqual(config.find_user_config(), (None, None))
+
+        copied, path = config.initialize()
+        found_path, stamp = config.find_user_config()
+        self.assertEqual(found_path, path)
+
+        with open(path, 'a') as f:
+            f.write("greeting = 'hello!'\n")
+        self.assertNotEqual(config.find_user_config()[1], stamp)
@@ -1,7 +1,15 @@
 # -*- coding: utf-8 -*-
+import os
+import threading
+
+from unittest.mock import patch
+
 from .base import TempAppDirTestCase
 from http_prompt.context import Context
-from http_prompt.contextio import save_context, load_context
+from http_prompt.contextio import (
+    _get_context_filepath, _get_snapshot_filepath, save_context, load_context,
+    ContextSaver)
+from http_prompt.execution import execute
 
 
 class TestContextIO(TempAppDirTestCase):
@@ -22,3 +30,180 @@ class TestContextIO(TempAppDirTestCase):
             'User-Agent': 'Ö',
             'Authorization': '中文'
         })
+
+    def test_save_and_load_context_without_execute(self):
+        c = Context('http://localhost:8000/api')
+        c.headers.update({
+            'Accept': 'application/json',
+            'Authorization': 'Bearer abc def',
+            'X-Empty': ''
+        })
+        c.querystring_params.update({'page': ['2'], 'q': ['a b']})
+        c.body_params.update({'name': 'John Doe', 'id': '1234'})
+        c.body_json_params.update({
+            'age': 20,
+            'tags': ['a', 'b'],
+            'meta': {'key': 'value with spaces'}
+        })
+        save_context(c)
+
+        loaded = Context('http://0.0.0.0')
+        with patch('http_prompt.contextio.execute') as execute_mock:
+            load_context(loaded)
+        self.assertFalse(execute_mock.called)
+        self.assertEqual(loaded, c)
+
+    def test_load_context_same_as_execute(self):
+        lines = [
+            '--form',
+            '--auth=user:pass',
+            "--auth-type='basic'",
+            'cd http://localhost/api',
+            "cd 'users/a b'",
+            'cd ../orgs',
+            'page==1',
+            'page==2',
+            "'q==hello world'",
+            "X-Quote:'it'\"'\"'s'",
+            'X-Escaped:a\\ b',
+            'name=`echo john`',
+            'age:=20',
+            "tags:='[1, 2]'",
+            'bad:=[1',
+            "'obj:={\"a\": 1}'",
+            '',
+        ]
+        path = self.make_tempfile('\n'.join(lines) + '\n')
+
+        loaded = Context('http://0.0.0.0')
+        load_context(loaded, path)
+
+        executed = Context('http://0.0.0.0')
+        for line in lines:
+            execute(line, executed)
+
+        self.assertEqual(loaded, executed)
+        self.assertEqual(loaded.url, 'http://localhost/api/users/orgs')
+        self.assertEqual(loaded.querystring_params['page'], ['2'])
+
+    def test_load_context_invalid_cd(self):
+        path = self.make_tempfile('cd //[1]\nname=john\n')
+
+        c = Context('http://localhost')
+        with patch('http_prompt.contextio.execute',
+                   wraps=execute) as execute_mock:
+            load_context(c, path)
+        execute_mock.assert_called_once_with('cd //[1]\n', c)
+        self.assertEqual(c.url, 'http://localhost')
+        self.assertEqual(c.body_params, {'name': 'john'})
+
+    def test_save_context_failure_keeps_old_file(self):
+        c = Context('http://localhost')
+        save_context(c)
+
+        c.url = 'http://example.com'
+        with patch('http_prompt.contextio.os.replace', side_effect=OSError):
+            with self.assertRaises(OSError):
+                save_context(c)
+
+        c = Context('http://0.0.0.0')
+        load_context(c)
+        self.assertEqual(c.url, 'http://localhost')
+        data_dir = os.path.dirname(_get_context_filepath())
+        self.assertEqual(sorted(os.listdir(data_dir)),
+                         ['context.hp', 'context.snapshot'])
+
+
+class TestContextSaver(TempAppDirTestCase):
+
+    def test_synchronous(self):
+        saver = ContextSaver()
+        with patch('http_prompt.contextio.save_context') as save_mock:
+            saver.save(Context('http://localhost'))
+            self.assertEqual(save_mock.call_count, 1)
+            saver.close()
+        self.assertEqual(save_mock.call_count, 1)
+
+    def test_coalesce_and_close(self):
+        saver = ContextSaver(delay=60)
+        c = Context('http://localhost')
+        with patch('http_prompt.contextio.save_context') as save_mock:
+            for i in range(100):
+                c.headers['X-Count'] = str(i)
+                saver.save(c)
+            self.assertFalse(save_mock.called)
+            saver.close()
+
+        self.assertEqual(save_mock.call_count, 1)
+        saved = save_mock.call_args[0][0]
+        self.assertIsNot(saved, c)
+        self.assertEqual(saved.headers, {'X-Count': '99'})
+
+    def test_background_write(self):
+        saver = ContextSaver(delay=0.01)
+        c = Context('http://localhost')
+        c.headers['Accept'] = 'text/html'
+        saved = threading.Event()
+        with patch('http_prompt.contextio.save_context') as save_mock:
+            save_mock.side_effect = lambda context: saved.set()
+            saver.save(c)
+            self.assertTrue(saved.wait(5))
+            saver.close()
+        self.assertEqual(save_mock.call_count, 1)
+
+    def test_flush(self):
+        saver = ContextSaver(delay=60)
+        saver.save(Context('http://localhost'))
+        saver.flush()
+
+        c = Context('http://0.0.0.0')
+        load_context(c)
+        self.assertEqual(c.url, 'http://localhost')
+        saver.close()
+
+
+class TestContextSnapshot(TempAppDirTestCase):
+
+    def setUp(self):
+        super(TestContextSnapshot, self).setUp()
+        self.context = Context('http://localhost/api')
+        self.context.headers['Accept'] = 'application/json'
+        self.context.querystring_params['page'] = ['1', '2']
+        self.context.body_json_params['tags'] = ['a', 'b']
+        self.context.options.update({'--form': None, '--style': 'native'})
+
+    def load_from_text(self):
+        c = Context('http://0.0.0.0')
+        with open(_get_context_filepath(), encoding='utf-8') as f:
+            for line in f:
+                execute(line, c)
+        return c
+
+    def test_load_from_snapshot(self):
+        save_context(self.context)
+
+        c = Context('http://0.0.0.0')
+        with patch('http_prompt.contextio._load_line') as load_line_mock:
+            load_context(c)
+        self.assertFalse(load_line_mock.called)
+        self.assertEqual(c, self.load_from_text())
+        self.assertEqual(c.options, {'--form': None})
+
+    def test_snapshot_invalidated_by_text_change(self):
+        save_context(self.context)
+        with open(_get_context_filepath(), 'a', encoding='utf-8') as f:
+            f.write('X-Extra:yes\n')
+
+        c = Context('http://0.0.0.0')
+        load_context(c)
+        self.assertEqual(c.headers, {'Accept': 'application/json',
+                                     'X-Extra': 'yes'})
+
+    def test_corrupted_snapshot(self):
+        save_context(self.context)
+        with open(_get_snapshot_filepath(), 'wb') as f:
+            f.write(b'garbage')
+
+        c = Context('http://0.0.0.0')
+        load_context(c)
+        self.assertEqual(c, self.load_from_text())
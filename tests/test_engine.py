@@ -0,0 +1,167 @@
+import sys
+
+from unittest.mock import patch
+
+import httpie.client
+
+from .base import HTTPServerTestCase
+from http_prompt.context import Context
+from http_prompt.engine import RequestEngine
+from http_prompt.execution import execute, RecordingListener
+from http_prompt.utils import strip_ansi_escapes
+
+
+class TestRequestEngine(HTTPServerTestCase):
+
+    def setUp(self):
+        super(TestRequestEngine, self).setUp()
+        # Responses are streamed to the pager with a generator
+        self.printed = []
+        self.patcher = patch(
+            'http_prompt.output.click.echo_via_pager',
+            side_effect=lambda text: self.printed.append(''.join(text)))
+        self.echo_via_pager = self.patcher.start()
+
+        self.context = Context(self.server_url)
+        self.context.options['--ignore-stdin'] = None
+        self.listener = RecordingListener()
+        self.engine = RequestEngine()
+
+    def tearDown(self):
+        self.engine.close()
+        self.patcher.stop()
+        super(TestRequestEngine, self).tearDown()
+
+    def test_response_returned(self):
+        execute('get /users', self.context, listener=self.listener,
+                engine=self.engine)
+
+        self.assertEqual(len(self.listener.responses), 1)
+        response = self.listener.responses[0]
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.url, self.server_url + '/users')
+        self.assertEqual(response.cookies['sessionid'], 'abcd')
+        printed = ''.join(self.printed)
+        self.assertIn('"path": "/users"', strip_ansi_escapes(printed))
+
+    def test_default_engine(self):
+        execute('get /orgs', self.context, listener=self.listener)
+
+        self.assertEqual(len(self.listener.responses), 1)
+        self.assertEqual(self.listener.responses[0].url,
+                         self.server_url + '/orgs')
+
+    def test_session_hooks(self):
+        with self.engine.bind() as exchange:
+            session = httpie.client.build_requests_session(verify=True)
+        self.assertEqual(session.hooks['response'], [exchange.response_hook])
+
+        session = httpie.client.build_requests_session(verify=True)
+        self.assertEqual(session.hooks['response'], [])
+
+    def test_nested_bind(self):
+        with self.engine.bind() as outer:
+            with self.engine.bind() as inner:
+                session = httpie.client.build_requests_session(verify=True)
+            session.get(self.server_url + '/inner')
+            self.assertIsNone(outer.response)
+        self.assertEqual(inner.response.url, self.server_url + '/inner')
+
+    def test_connection_reused(self):
+        for _ in range(3):
+            execute('get /users', self.context, engine=self.engine)
+        self.assertEqual(self.server.num_connections, 1)
+
+    def test_connection_not_reused(self):
+        engine = RequestEngine(idle_timeout=0)
+        for _ in range(3):
+            execute('get /users', self.context, engine=engine)
+        self.assertEqual(self.server.num_connections, 3)
+
+    @patch('http_prompt.engine.monotonic')
+    def test_idle_connection_closed(self, monotonic):
+        monotonic.return_value = 100
+        execute('get /users', self.context, engine=self.engine)
+        execute('get /users', self.context, engine=self.engine)
+        self.assertEqual(self.server.num_connections, 1)
+
+        monotonic.return_value = 200
+        execute('get /users', self.context, engine=self.engine)
+        self.assertEqual(self.server.num_connections, 2)
+
+    def test_close(self):
+        execute('get /users', self.context, engine=self.engine)
+        self.engine.close()
+        execute('get /users', self.context, engine=self.engine)
+        self.assertEqual(self.server.num_connections, 2)
+
+    def test_timing_off(self):
+        with self.engine.bind() as exchange:
+            session = httpie.client.build_requests_session(verify=True)
+            session.get(self.server_url + '/users')
+        self.assertEqual(exchange.timings, [])
+        self.assertEqual(len(self.engine.timings), 0)
+
+    def test_timing(self):
+        engine = RequestEngine(idle_timeout=0, timing=True, timing_history=2)
+        with engine.bind() as exchange:
+            session = httpie.client.build_requests_session(verify=True)
+            session.get(self.server_url + '/users')
+            session.get(self.server_url + '/orgs')
+
+        first, second = exchange.timings
+        self.assertEqual(first.method, 'GET')
+        self.assertEqual(first.url, self.server_url + '/users')
+        self.assertEqual(first.status, 200)
+        self.assertIsNotNone(first.dns)
+        self.assertIsNotNone(first.connect)
+        self.assertIsNone(first.tls)
+        self.assertGreaterEqual(first.ttfb, first.dns + first.connect)
+        self.assertGreaterEqual(first.total, first.ttfb)
+
+        # The connection was reused
+        self.assertIsNone(second.dns)
+        self.assertIsNone(second.connect)
+        self.assertEqual(self.server.num_connections, 1)
+
+        with engine.bind():
+            session = httpie.client.build_requests_session(verify=True)
+            session.get(self.server_url + '/repos')
+        self.assertEqual([t.url for t in engine.timings],
+                         [self.server_url + '/orgs',
+                          self.server_url + '/repos'])
+
+    @patch('http_prompt.execution.click.secho')
+    def test_timing_commands(self, secho):
+        execute('timing on', self.context, engine=self.engine)
+        execute('get /users', self.context, engine=self.engine)
+        self.assertIn('GET %s/users 200  DNS ' % self.server_url,
+                      secho.call_args[0][0])
+
+        execute('timing off', self.context, engine=self.engine)
+        execute('get /orgs', self.context, engine=self.engine)
+        self.assertEqual(secho.call_count, 1)
+
+        self.echo_via_pager.reset_mock()
+        execute('timing', self.context, engine=self.engine)
+        printed = self.echo_via_pager.call_args[0][0]
+        self.assertEqual(len(printed.splitlines()), 1)
+        self.assertTrue(printed.startswith('GET %s/users 200' %
+                                           self.server_url))
+
+    def test_source_concurrently(self):
+        paths = ['/items/%d' % i for i in range(200)]
+        filename = self.make_tempfile(
+            ''.join('get %s\n' % path for path in paths))
+        # Switch threads often, so requests overlap while being parsed
+        interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+        self.addCleanup(sys.setswitchinterval, interval)
+        execute('source -j 8 %s' % filename, self.context,
+                listener=self.listener, engine=self.engine)
+
+        self.assertEqual(len(self.printed), len(paths))
+        for path, printed in zip(paths, self.printed):
+            self.assertIn('"path": "%s"' % path, strip_ansi_escapes(printed))
+        self.assertEqual([r.url for r in self.listener.responses],
+                         [self.server_url + path for path in paths])
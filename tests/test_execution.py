@@ -5,15 +5,21 @@ import json
 import shutil
 import os
 import sys
+import threading
+import time
 
 import pytest
 
 from collections import namedtuple
 
-from unittest.mock import patch
+from unittest.mock import Mock, patch
 
+from parsimonious.grammar import Grammar
+
+from http_prompt import xdg
 from http_prompt.context import Context
-from http_prompt.execution import execute, HTTPIE_PROGRAM_NAME
+from http_prompt.execution import (execute, load_grammar, parse,
+                                   shell_subs_cache, HTTPIE_PROGRAM_NAME)
 
 from .base import TempAppDirTestCase
 
@@ -24,14 +30,26 @@ class ExecutionTestCase(TempAppDirTestCase):
         super(ExecutionTestCase, self).setUp()
         self.patchers = [
             ('httpie_main', patch('http_prompt.execution.httpie_main')),
-            ('echo_via_pager',
-             patch('http_prompt.output.click.echo_via_pager')),
             ('secho', patch('http_prompt.execution.click.secho')),
             ('get_terminal_size', patch('http_prompt.utils.get_terminal_size'))
         ]
         for attr_name, patcher in self.patchers:
             setattr(self, attr_name, patcher.start())
 
+        # Output streamed to the pager is passed as a generator. Record it
+        # as text like the rest.
+        self.echo_via_pager = Mock()
+
+        def echo_via_pager(text):
+            if not isinstance(text, str):
+                text = ''.join(text)
+            self.echo_via_pager(text)
+
+        patcher = patch('http_prompt.output.click.echo_via_pager',
+                        echo_via_pager)
+        patcher.start()
+        self.patchers.append(('echo_via_pager', patcher))
+
         self.context = Context('http://localhost', spec={
             'paths': {
                 '/users': {},
@@ -392,6 +410,49 @@ class TestExecution_source_and_exec(ExecutionTestCase):
             '--verify': 'no'
         })
 
+    def test_source_concurrently(self):
+        lock = threading.Lock()
+        active = []
+        max_active = []
+
+        def httpie_main(args, env):
+            with lock:
+                active.append(args)
+                max_active.append(len(active))
+            # Make the first request finish last
+            time.sleep(0.3 if args[2].endswith('/a') else 0.05)
+            env.stdout.write(' '.join(args[1:]))
+            with lock:
+                active.remove(args)
+
+        self.httpie_main.side_effect = httpie_main
+        self.context.options.clear()
+        self.context.headers.clear()
+        self.context.querystring_params.clear()
+        self.context.body_params.clear()
+
+        filename = self.make_tempfile(
+            "get /a\n"
+            "get /b X-Foo:bar\n"
+            "\n"
+            "get /c > %s\n"
+            "get /d\n"
+            "Accept:text/html\n"
+            "get /e\n" % self.make_tempfile(''))
+        execute('source -j 3 %s' % filename, self.context)
+
+        printed = [c[0][0] for c in self.echo_via_pager.call_args_list]
+        base = 'http://localhost:8000'
+        self.assertEqual(printed, [
+            'GET %s/a' % base,
+            'GET %s/b X-Foo:bar' % base,
+            'GET %s/d' % base,
+            'GET %s/e Accept:text/html' % base
+        ])
+        self.assertEqual(self.httpie_main.call_count, 5)
+        self.assertEqual(max(max_active), 2)
+        self.assertEqual(self.context.url, base + '/api')
+
     def test_exec(self):
         execute('exec %s' % self.filename, self.context)
 
@@ -558,11 +619,11 @@ class TestExecution_help(ExecutionTestCase):
 
     def test_help(self):
         execute('help', self.context)
-        self.assert_stdout_startswith('Commands:\n\tcd')
+        self.assert_stdout_startswith('Commands:\n\tbench')
 
     def test_help_with_spaces(self):
         execute('  help   ', self.context)
-        self.assert_stdout_startswith('Commands:\n\tcd')
+        self.assert_stdout_startswith('Commands:\n\tbench')
 
 
 class TestExecution_exit(ExecutionTestCase):
@@ -634,6 +695,34 @@ class TestExecution_cd(ExecutionTestCase):
         execute('cd', self.context)
         self.assertEqual(self.context.url, 'http://localhost')
 
+    def test_path_servers(self):
+        self.context = Context(spec={
+            'servers': [{'url': 'https://api.example.com/v1'}],
+            'paths': {
+                '/users': {},
+                '/files/{id}/content': {
+                    'servers': [{'url': 'https://files.example.com/v1'}]
+                }
+            }
+        })
+        self.assertEqual(self.context.url, 'https://api.example.com/v1')
+
+        execute('cd users', self.context)
+        self.assertEqual(self.context.url, 'https://api.example.com/v1/users')
+
+        execute('cd ../files/1/content', self.context)
+        self.assertEqual(self.context.url,
+                         'https://files.example.com/v1/files/1/content')
+
+        execute('get //api.example.com/v1/files/2/content', self.context)
+        self.assertEqual(self.httpie_main.call_args[0][0][-1],
+                         'https://files.example.com/v1/files/2/content')
+
+        # Going up leaves the server of the path
+        execute('cd ..', self.context)
+        self.assertEqual(self.context.url,
+                         'https://api.example.com/v1/files/1')
+
 
 class TestExecution_rm(ExecutionTestCase):
 
@@ -783,6 +872,22 @@ class TestExecution_ls(ExecutionTestCase):
         execute('ls /orgs/1', self.context)
         self.assert_stdout('events  members\n')
 
+    def test_path_server(self):
+        self.context = Context(spec={
+            'servers': [{'url': 'https://api.example.com/v1'}],
+            'paths': {
+                '/files/{id}/content': {
+                    'servers': [{'url': 'https://files.example.com'}],
+                    'get': {'parameters': [{'name': 'range', 'in': 'query'}]}
+                }
+            }
+        })
+        execute('cd files/1/content', self.context)
+        self.assertEqual(self.context.url,
+                         'https://files.example.com/files/1/content')
+        execute('ls', self.context)
+        self.assert_stdout('range\n')
+
     def test_redirect_write(self):
         filename = self.make_tempfile()
 
@@ -1392,6 +1497,14 @@ class TestPipe(ExecutionTestCase):
         execute('env | grep name', self.context)
         self.assert_stdout('name=Jane\nusername=jane\n')
 
+    @pytest.mark.skipif(sys.platform == 'win32', reason="Unix only")
+    def test_larger_than_pipe_buffer(self):
+        # Would deadlock if the output of cat wasn't read while its input
+        # is being written
+        self.context.body_params = {'data': 'x' * (4 * 1024 * 1024)}
+        execute('env | cat', self.context)
+        self.assertIn('data=' + 'x' * (4 * 1024 * 1024), self.get_stdout())
+
 
 class TestShellSubstitution(ExecutionTestCase):
 
@@ -1532,6 +1645,72 @@ class TestShellSubstitution(ExecutionTestCase):
             'greeting': 'hello world'
         })
 
+    @pytest.mark.skipif(sys.platform == 'win32', reason="Unix only")
+    def test_parallel(self):
+        # Each substitution only prints its value once it has seen the
+        # marker file of the other, which needs both to run at once
+        def wait_for(mine, other, value):
+            mine = os.path.join(self.temp_dir, mine)
+            other = os.path.join(self.temp_dir, other)
+            return ("touch '%s'; for i in $(seq 100); do "
+                    "[ -e '%s' ] && break; sleep 0.1; done; "
+                    "[ -e '%s' ] && echo %s" % (mine, other, other, value))
+
+        execute("a=`%s` b=`%s`" % (wait_for('a', 'b', 1),
+                                   wait_for('b', 'a', 2)), self.context)
+        self.assertEqual(self.context.body_params, {'a': '1', 'b': '2'})
+
+
+@pytest.mark.skipif(sys.platform == 'win32', reason="Unix only")
+class TestShellSubstitutionTTL(ExecutionTestCase):
+
+    def setUp(self):
+        super(TestShellSubstitutionTTL, self).setUp()
+        shell_subs_cache.clear()
+        self.addCleanup(shell_subs_cache.clear)
+        self.counter_path = os.path.join(self.temp_dir, 'counter')
+
+    def count_cmd(self):
+        # Shell command that prints how many times it has been run
+        return "echo x >> '%s'; wc -l < '%s'" % (self.counter_path,
+                                                  self.counter_path)
+
+    def test_cached(self):
+        command = 'token=`%s`@60s' % self.count_cmd()
+        execute(command, self.context)
+        execute(command, self.context)
+        self.assertEqual(self.context.body_params, {'token': '1'})
+
+    def test_not_cached_without_ttl(self):
+        command = 'token=`%s`' % self.count_cmd()
+        execute(command, self.context)
+        execute(command, self.context)
+        self.assertEqual(self.context.body_params, {'token': '2'})
+
+    def test_expired(self):
+        command = 'token=`%s`@0s' % self.count_cmd()
+        execute(command, self.context)
+        execute(command, self.context)
+        self.assertEqual(self.context.body_params, {'token': '2'})
+
+    def test_literal_at_digits(self):
+        execute('email=`echo john`@123.example.com', self.context)
+        self.assertEqual(self.context.body_params,
+                         {'email': 'john@123.example.com'})
+        self.assertIsNone(shell_subs_cache.get('echo john'))
+
+    def test_quoted(self):
+        command = "'token=`%s`@60s'" % self.count_cmd().replace("'", '"')
+        execute(command, self.context)
+        execute(command, self.context)
+        self.assertEqual(self.context.body_params, {'token': '1'})
+
+    def test_ttl_units(self):
+        command = 'Authorization:"Bearer `%s`@1m"' % self.count_cmd()
+        execute(command, self.context)
+        execute(command, self.context)
+        self.assertEqual(self.context.headers, {'Authorization': 'Bearer 1'})
+
 
 class TestCommandPreviewRedirection(ExecutionTestCase):
 
@@ -1629,3 +1808,75 @@ class TestCommandPreviewRedirection(ExecutionTestCase):
         with open(filename) as f:
             content = f.read()
         self.assertEqual(content, 'hello world\nhttp http://localhost\n')
+
+
+class TestParseCache(ExecutionTestCase):
+
+    def setUp(self):
+        super(TestParseCache, self).setUp()
+        parse.cache_clear()
+
+    def test_cache_hit(self):
+        execute("Accept:'text/html'", self.context)
+        execute("Accept:'text/html'", self.context)
+        execute("rm -h 'Accept'", self.context)
+
+        cache_info = parse.cache_info()
+        self.assertEqual(cache_info.hits, 1)
+        self.assertEqual(cache_info.misses, 2)
+        self.assertFalse(self.context.headers)
+
+    def test_syntax_error_not_cached(self):
+        execute('cd /foo bar', self.context)
+        execute('cd /foo bar', self.context)
+        self.assertEqual(parse.cache_info().currsize, 0)
+        self.assert_stderr('Syntax error near "bar"')
+
+    @pytest.mark.skipif(sys.platform == 'win32', reason="Unix only")
+    def test_shell_subs_reevaluated(self):
+        filename = self.make_tempfile('one')
+        command = 'X-Value:`cat %s`' % filename
+        execute(command, self.context)
+        self.assertEqual(self.context.headers['X-Value'], 'one')
+
+        with open(filename, 'w') as f:
+            f.write('two')
+        execute(command, self.context)
+        self.assertEqual(self.context.headers['X-Value'], 'two')
+        self.assertEqual(parse.cache_info().hits, 1)
+
+
+class TestGrammarCache(TempAppDirTestCase):
+
+    def setUp(self):
+        super(TestGrammarCache, self).setUp()
+        self.cache_path = os.path.join(xdg.get_data_dir(), 'grammar')
+
+    def test_saved_and_loaded(self):
+        grammar = load_grammar()
+        self.assertTrue(os.path.exists(self.cache_path))
+
+        with patch('http_prompt.execution.Grammar') as grammar_mock:
+            cached_grammar = load_grammar()
+        self.assertFalse(grammar_mock.called)
+        self.assertEqual(str(cached_grammar), str(grammar))
+        self.assertEqual(str(cached_grammar.parse('get /foo')),
+                         str(grammar.parse('get /foo')))
+
+    def test_stale(self):
+        load_grammar()
+        with patch('http_prompt.execution.__version__', '0.0.0'):
+            with patch('http_prompt.execution.Grammar',
+                       wraps=Grammar) as grammar_mock:
+                load_grammar()
+        self.assertTrue(grammar_mock.called)
+
+    def test_corrupted(self):
+        with open(self.cache_path, 'wb') as f:
+            f.write(b'garbage')
+        grammar = load_grammar()
+        self.assertEqual(grammar.parse('get /foo').expr_name, 'command')
+
+        with patch('http_prompt.execution.Grammar') as grammar_mock:
+            load_grammar()
+        self.assertFalse(grammar_mock.called)
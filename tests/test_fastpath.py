@@ -0,0 +1,129 @@
+import ast
+import os
+
+from unittest.mock import patch
+
+from .test_execution import ExecutionTestCase
+from http_prompt import fastpath
+from http_prompt.context import Context
+from http_prompt.execution import execute
+
+
+def _load_corpus():
+    """Collect the literal commands passed to execute() in
+    test_execution.py.
+    """
+    path = os.path.join(os.path.dirname(__file__), 'test_execution.py')
+    with open(path, encoding='utf-8') as f:
+        tree = ast.parse(f.read())
+
+    commands = []
+    for node in ast.walk(tree):
+        if (isinstance(node, ast.Call) and
+                getattr(node.func, 'id', None) == 'execute' and
+                node.args and isinstance(node.args[0], ast.Constant) and
+                isinstance(node.args[0].value, str)):
+            commands.append(node.args[0].value)
+    return commands
+
+
+CORPUS = _load_corpus() + [
+    'Accept:application/json',
+    'name=john page==1 page==2 X-Empty:',
+    'a===b c:d=e f:g>h',
+    'GET',
+    'get /users',
+    'Post users/{username}/events',
+    'delete http://example.com/users?page=1',
+    'options ../orgs/',
+    'cd',
+    'cd ..',
+    'cd http://example.com/api',
+    'rm *',
+    'rm -h Accept',
+    'rm -h *',
+    'rm -q page',
+    'rm -b name',
+    'rm -b *',
+    'rm -o --form',
+    'rm -h DoesNotExist',
+]
+
+
+class CountingListener(object):
+
+    def __init__(self):
+        self.num_changes = 0
+
+    def context_changed(self, context):
+        self.num_changes += 1
+
+    def response_returned(self, context, response):
+        pass
+
+
+class TestFastPath(ExecutionTestCase):
+
+    def _new_context(self):
+        context = Context('http://localhost/users', spec={
+            'paths': {'/users': {}, '/orgs': {}}
+        })
+        context.headers.update({'Accept': 'text/html', 'X-Foo': 'bar'})
+        context.querystring_params.update({'page': ['1']})
+        context.body_params.update({'name': 'alice'})
+        context.body_json_params.update({'age': 20})
+        context.options.update({'--form': None})
+        return context
+
+    def _run(self, command, fast):
+        context = self._new_context()
+        listener = CountingListener()
+        self.httpie_main.reset_mock()
+        self.secho.reset_mock()
+        if fast:
+            execute(command, context, listener=listener)
+        else:
+            with patch('http_prompt.execution.fastpath.recognize',
+                       return_value=None):
+                execute(command, context, listener=listener)
+        # Environment objects passed to HTTPie don't compare equal
+        httpie_args = [c[0] for c in self.httpie_main.call_args_list]
+        return (context, listener.num_changes, httpie_args,
+                self.secho.call_args_list)
+
+    def test_corpus(self):
+        num_recognized = 0
+        for command in CORPUS:
+            if not fastpath.recognize(command):
+                continue
+            num_recognized += 1
+            with self.subTest(command=command):
+                self.assertEqual(self._run(command, fast=True),
+                                 self._run(command, fast=False))
+        self.assertGreater(num_recognized, 30)
+
+    def test_not_recognized(self):
+        for command in ['', '  ', 'ls', 'env', 'exit', 'getusers',
+                        'cdfoo', "name='john'", 'name="john"',
+                        'name:`echo john`', 'a\\:b:c', 'age:=20',
+                        '--form', '-hello:world', 'get /users > out.txt',
+                        'get | grep name', 'get -v', 'get /users?a=b',
+                        'get users name=john', 'rm -hAccept',
+                        'rm -h a:b', 'httpie get', 'cd a b']:
+            with self.subTest(command=command):
+                self.assertIsNone(fastpath.recognize(command))
+
+    def test_recognized(self):
+        self.assertEqual(fastpath.recognize(' Accept:text/html '),
+                         ('mutate', [('Accept', ':', 'text/html')]))
+        self.assertEqual(fastpath.recognize('a==b==c'),
+                         ('mutate', [('a', '==', 'b==c')]))
+        self.assertEqual(fastpath.recognize('GET /users'),
+                         ('action', ('GET', '/users')))
+        self.assertEqual(fastpath.recognize('post'),
+                         ('action', ('post', None)))
+        self.assertEqual(fastpath.recognize('cd'), ('cd', (None,)))
+        self.assertEqual(fastpath.recognize('cd /orgs'), ('cd', ('/orgs',)))
+        self.assertEqual(fastpath.recognize('rm *'), ('rm', ('*', None)))
+        self.assertEqual(fastpath.recognize('rm -q page'),
+                         ('rm', ('-q', 'page')))
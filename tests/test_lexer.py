@@ -1,6 +1,6 @@
 import unittest
 
-from pygments.token import Keyword, String, Text, Error, Name, Operator
+from pygments.token import Keyword, String, Text, Error, Name, Operator, Number
 
 from http_prompt.lexer import HttpPromptLexer
 
@@ -242,6 +242,23 @@ class TestLexer_env(LexerTestCase):
         ])
 
 
+class TestLexer_bench(LexerTestCase):
+
+    def test_bench_simple(self):
+        self.assertEqual(self.get_tokens('bench get'), [
+            (Keyword, 'bench'), (Keyword, 'get')
+        ])
+
+    def test_bench_options(self):
+        self.assertEqual(self.get_tokens(
+            'bench post -n 100 -c 5 /users name=alice > /tmp/bench.txt'), [
+            (Keyword, 'bench'), (Keyword, 'post'),
+            (Name, '-n'), (String, '100'), (Name, '-c'), (String, '5'),
+            (String, '/users'), (Name, 'name'), (Operator, '='),
+            (String, 'alice'), (Operator, '>'), (String, '/tmp/bench.txt')
+        ])
+
+
 class TestLexer_rm(LexerTestCase):
 
     def test_header(self):
@@ -354,6 +371,12 @@ class TestLexer_source(LexerTestCase):
             (Keyword, 'source'), (String, r'/tmp/my\ file.txt')
         ])
 
+    def test_source_jobs(self):
+        self.assertEqual(self.get_tokens('source -j 8 /tmp/script.hp'), [
+            (Keyword, 'source'), (Name, '-j'), (String, '8'),
+            (String, '/tmp/script.hp')
+        ])
+
 
 class TestLexer_exec(LexerTestCase):
 
@@ -497,6 +520,29 @@ class TestShellCode(LexerTestCase):
             (Text, '`'),
         ])
 
+    def test_ttl(self):
+        self.assertEqual(self.get_tokens('Token:`echo secret`@60s'), [
+            (Name, 'Token'),
+            (Operator, ':'),
+            (Text, '`'),
+            (Name.Builtin, 'echo'),
+            (Text, 'secret'),
+            (Text, '`'),
+            (Number, '@60s'),
+        ])
+
+    def test_literal_at_digits(self):
+        tokens = self.get_tokens('email=`echo john`@123.example.com')
+        self.assertEqual(tokens, [
+            (Name, 'email'),
+            (Operator, '='),
+            (Text, '`'),
+            (Name.Builtin, 'echo'),
+            (Text, 'john'),
+            (Text, '`'),
+            (String, '@123.example.com'),
+        ])
+
     def test_httpie_body_param(self):
         self.assertEqual(self.get_tokens('httpie post name=`echo john`'), [
             (Keyword, 'httpie'),
@@ -0,0 +1,98 @@
+import io
+import threading
+import unittest
+
+from unittest.mock import patch
+
+from http_prompt.output import PagerStream, TextWriter, TransferProgress
+
+
+class TestPagerStream(unittest.TestCase):
+
+    def setUp(self):
+        self.patcher = patch('http_prompt.output.click.echo_via_pager')
+        self.echo_via_pager = self.patcher.start()
+
+    def tearDown(self):
+        self.patcher.stop()
+
+    def test_streamed(self):
+        received = []
+        first_chunk = threading.Event()
+
+        def echo_via_pager(chunks):
+            for chunk in chunks:
+                received.append(chunk)
+                first_chunk.set()
+        self.echo_via_pager.side_effect = echo_via_pager
+
+        stream = PagerStream()
+        stream.write(b'HTTP/1.1 200 OK\n\n')
+        # The pager gets the data before the stream is closed
+        self.assertTrue(first_chunk.wait(5))
+        stream.write('{"name": "café"}'.encode()[:-3])
+        stream.write('{"name": "café"}'.encode()[-3:] + b'\n\n')
+        stream.close()
+
+        self.assertEqual(self.echo_via_pager.call_count, 1)
+        # Trailing whitespace is dropped, multibyte characters survive being
+        # split across writes
+        self.assertEqual(''.join(received),
+                         'HTTP/1.1 200 OK\n\n{"name": "café"}')
+
+    def test_nothing_written(self):
+        stream = PagerStream()
+        stream.close()
+        self.assertFalse(self.echo_via_pager.called)
+
+    def test_pager_quit(self):
+        # The pager exits without reading everything
+        self.echo_via_pager.side_effect = lambda chunks: next(chunks)
+
+        stream = PagerStream(max_chunks=2)
+        for _ in range(10):
+            stream.write(b'x' * 1024)
+        stream.close()
+        self.assertEqual(self.echo_via_pager.call_count, 1)
+
+
+class TestTextWriter(unittest.TestCase):
+
+    def test_write(self):
+        fp = io.BytesIO()
+        writer = TextWriter(fp)
+        writer.write(b'\x00\xff')
+        writer.write('caf\xe9')
+        self.assertEqual(fp.getvalue(), b'\x00\xffcaf\xc3\xa9')
+        self.assertIsNone(writer.progress)
+
+    @patch('http_prompt.output.sys.stderr')
+    def test_progress(self, stderr):
+        stderr.isatty.return_value = True
+        writer = TextWriter(io.BytesIO(), name='dump.json')
+        writer.write(b'x' * TransferProgress.THRESHOLD)
+        writer.close()
+        written = ''.join(c[0][0] for c in stderr.write.call_args_list)
+        self.assertEqual(written, '\rWriting dump.json: 1.00 MB' * 2 + '\n')
+
+
+class TestTransferProgress(unittest.TestCase):
+
+    def test_small_transfer(self):
+        stream = io.StringIO()
+        progress = TransferProgress('out.txt', stream=stream)
+        progress.update(1024)
+        progress.finish()
+        self.assertEqual(stream.getvalue(), '')
+
+    @patch('http_prompt.output.monotonic')
+    def test_throttled(self, monotonic):
+        stream = io.StringIO()
+        progress = TransferProgress('out.txt', stream=stream)
+        monotonic.return_value = 100
+        progress.update(TransferProgress.THRESHOLD)
+        progress.update(1024)
+        monotonic.return_value = 101
+        progress.update(1024)
+        self.assertEqual(stream.getvalue().count('\r'), 2)
+        self.assertTrue(stream.getvalue().endswith('1.00 MB'))
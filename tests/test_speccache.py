@@ -0,0 +1,150 @@
+import json
+import os
+import unittest
+
+from unittest.mock import patch
+
+from .base import HTTPServerTestCase, TempAppDirTestCase
+from http_prompt.cli import normalize_url
+from http_prompt.context import Context
+from http_prompt.speccache import parse_spec, sniff_format, SpecCache
+
+
+SPEC = {'paths': {'/users': {}, '/orgs': {}}}
+
+
+class TestSpecCacheFile(TempAppDirTestCase):
+
+    def setUp(self):
+        super(TestSpecCacheFile, self).setUp()
+        self.spec_path = self.make_tempfile(json.dumps(SPEC))
+        self.spec_url = normalize_url(None, None, self.spec_path)
+
+    def fetch_and_build(self):
+        spec_cache = SpecCache(self.spec_url)
+        spec = spec_cache.fetch()
+        fresh = spec_cache.fresh
+        context = Context(spec=spec)
+        if fresh:
+            spec_cache.save()
+        return spec, fresh, context
+
+    def test_cache_miss_and_hit(self):
+        spec, fresh, context = self.fetch_and_build()
+        self.assertEqual(spec, SPEC)
+        self.assertTrue(fresh)
+
+        with patch('http_prompt.speccache.urlopen') as urlopen_mock:
+            spec, fresh, context = self.fetch_and_build()
+        self.assertFalse(urlopen_mock.called)
+        self.assertEqual(spec, SPEC)
+        self.assertFalse(fresh)
+        self.assertEqual(set(n.name for n in context.root.ls()),
+                         {'users', 'orgs'})
+
+    def test_file_changed(self):
+        self.fetch_and_build()
+
+        with open(self.spec_path, 'w') as f:
+            json.dump({'paths': {'/repos': {}}}, f)
+        spec, fresh, context = self.fetch_and_build()
+        self.assertTrue(fresh)
+        self.assertEqual(set(n.name for n in context.root.ls()), {'repos'})
+
+    def test_same_content_reuses_spec(self):
+        self.fetch_and_build()
+
+        # Touch the file without changing the content
+        stat = os.stat(self.spec_path)
+        os.utime(self.spec_path, ns=(stat.st_atime_ns,
+                                     stat.st_mtime_ns + 10 ** 9))
+        with patch('http_prompt.speccache.parse_spec') as parse_mock:
+            spec, fresh, context = self.fetch_and_build()
+        self.assertFalse(parse_mock.called)
+        self.assertFalse(fresh)
+        self.assertEqual(spec, SPEC)
+
+    def test_invalid_spec_not_cached(self):
+        with open(self.spec_path, 'w') as f:
+            f.write('{')
+        spec, fresh, context = self.fetch_and_build()
+        self.assertIsNone(spec)
+        spec, fresh, context = self.fetch_and_build()
+        self.assertIsNone(spec)
+        self.assertTrue(fresh)
+
+
+class TestSpecCacheHTTP(HTTPServerTestCase):
+
+    class RequestHandler(HTTPServerTestCase.RequestHandler):
+
+        def do_GET(self):
+            self.server.num_requests += 1
+            etag = '"%s"' % self.server.version
+            if self.headers.get('If-None-Match') == etag:
+                self.send_response(304)
+                self.send_header('ETag', etag)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            body = json.dumps(self.server.spec).encode()
+            self.send_response(200)
+            self.send_header('ETag', etag)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    def setUp(self):
+        super(TestSpecCacheHTTP, self).setUp()
+        self.server.num_requests = 0
+        self.server.version = 1
+        self.server.spec = SPEC
+        self.spec_url = self.server_url + '/spec.json'
+
+    def test_not_modified(self):
+        spec_cache = SpecCache(self.spec_url)
+        spec_cache.fetch()
+        spec_cache.save()
+
+        spec_cache = SpecCache(self.spec_url)
+        with patch('http_prompt.speccache.parse_spec') as parse_mock:
+            spec = spec_cache.fetch()
+        self.assertFalse(parse_mock.called)
+        self.assertEqual(spec, SPEC)
+        self.assertFalse(spec_cache.fresh)
+        self.assertEqual(self.server.num_requests, 2)
+
+    def test_modified(self):
+        spec_cache = SpecCache(self.spec_url)
+        spec_cache.fetch()
+        spec_cache.save()
+
+        self.server.version = 2
+        self.server.spec = {'paths': {'/repos': {}}}
+        spec_cache = SpecCache(self.spec_url)
+        self.assertEqual(spec_cache.fetch(), {'paths': {'/repos': {}}})
+        self.assertTrue(spec_cache.fresh)
+
+
+class TestParseSpec(unittest.TestCase):
+
+    def test_sniff_format(self):
+        self.assertEqual(sniff_format(b'a: 1', 'application/json'), 'json')
+        self.assertEqual(sniff_format(b'{}', 'application/x-yaml'), 'yaml')
+        self.assertEqual(sniff_format(b'a: 1', 'text/plain',
+                                      'http://x/spec.json'), 'json')
+        self.assertEqual(sniff_format(b'{}', None, 'file:/spec.yml'), 'yaml')
+        self.assertEqual(sniff_format(b'  \n{"a": 1}'), 'json')
+        self.assertEqual(sniff_format(b'swagger: "2.0"'), 'yaml')
+
+    def test_yaml_not_decoded_as_json(self):
+        with patch('http_prompt.speccache.json.loads') as loads_mock:
+            self.assertEqual(parse_spec(b'swagger: "2.0"'), {'swagger': '2.0'})
+        self.assertFalse(loads_mock.called)
+
+    def test_mislabeled_json(self):
+        self.assertEqual(parse_spec(b'a: 1', 'application/json'), {'a': 1})
+
+    def test_invalid(self):
+        self.assertIsNone(parse_spec(b'{', 'application/json'))
+        self.assertIsNone(parse_spec(b'a: [', None))
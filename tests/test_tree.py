@@ -85,6 +85,19 @@ class TestNode(unittest.TestCase):
         self.assertEqual(root.find_child('x').name, '{b}')
         self.assertFalse(root.find_child('x', wildcard=False))
 
+    def test_find_child_wide(self):
+        root = Node('root')
+        for i in range(3000):
+            root.add_path('v1', 'item%d' % i, 'id')
+        root.add_path('v1', '{item}', 'id')
+
+        node_v1 = root.find_child('v1')
+        self.assertEqual(len(node_v1.children), 3001)
+        self.assertEqual(node_v1.find_child('item2999').name, 'item2999')
+        self.assertEqual(node_v1.find_child('x').name, '{item}')
+        self.assertEqual([n.name for n in root.ls('v1', 'x')], ['id'])
+        self.assertFalse(hasattr(node_v1, '__dict__'))
+
     def test_ls(self):
         self.assertEqual([n.name for n in self.root.ls('a')], list('bd'))
         self.assertEqual([n.name for n in self.root.ls('a', 'b')], list('cf'))
@@ -129,3 +142,29 @@ class TestNode(unittest.TestCase):
 
         self.assertEqual([n.name for n in self.root.ls('q')],
                          list('rustv'))
+
+    def test_listing_cached(self):
+        node_a = self.root.find_child('a')
+        listing = node_a.listing()
+        self.assertEqual([n.name for n in listing], ['b', 'd'])
+        self.assertIs(node_a.listing(), listing)
+
+        # Adding a child invalidates the cached listing
+        node_a.add_path('c')
+        self.assertEqual([n.name for n in node_a.listing()], ['b', 'c', 'd'])
+
+    def test_loader(self):
+        def load_q(node):
+            node.add_path('r', node_type='file')
+
+        def load(node):
+            node.add_path('q')
+            node.find_child('q').loader = load_q
+
+        root = Node('root')
+        root.loader = load
+        self.assertEqual([n.name for n in root.ls()], ['q'])
+        self.assertIsNone(root.loader)
+        self.assertIsNotNone(root.find_child('q').loader)
+        self.assertEqual([n.name for n in root.ls('q')], ['r'])
+        self.assertIsNone(root.find_child('q').loader)
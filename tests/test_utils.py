@@ -1,3 +1,5 @@
+import os
+
 from http_prompt import utils
 
 
@@ -90,3 +92,18 @@ def test_colformat_github_top_endpoints():
         'events        gitignore     markdown      notifications repos         teams',  # noqa
         'feeds         issues        meta          orgs          repositories  user'  # noqa
     ]
+
+
+def test_write_atomic(tmpdir):
+    path = str(tmpdir.join('data'))
+    utils.write_atomic(path, b'hello')
+    with open(path, 'rb') as f:
+        assert f.read() == b'hello'
+    assert os.stat(path).st_mode & 0o777 == 0o666 & ~utils._UMASK
+
+    os.chmod(path, 0o640)
+    utils.write_atomic(path, b'world')
+    with open(path, 'rb') as f:
+        assert f.read() == b'world'
+    assert os.stat(path).st_mode & 0o777 == 0o640
+    assert os.listdir(str(tmpdir)) == ['data']